@@ -0,0 +1 @@
+# Offline benchmarks, run from the backend directory: python -m benchmarks.<name>
@@ -0,0 +1,111 @@
+"""
+Minimal in-process ASGI client for the benchmarks.
+
+httpx's ASGITransport collects the whole response body before returning, so it
+cannot measure time-to-first-byte. This driver calls the app directly and
+timestamps the first non-empty body message. httpx is only used to encode
+request bodies (JSON, multipart).
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass
+class ASGIResponse:
+    status: int
+    headers: dict
+    body: bytes
+    ttfb: Optional[float]  # seconds until the first body bytes
+    total: float           # seconds until the response completed
+    chunks: int = 0        # body messages sent by the app
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    def __init__(self, app):
+        self.app = app
+        self._to_app: Optional[asyncio.Queue] = None
+        self._from_app: Optional[asyncio.Queue] = None
+        self._lifespan: Optional[asyncio.Task] = None
+
+    async def startup(self):
+        """
+        Run the app's startup handlers through the ASGI lifespan protocol.
+        """
+        self._to_app, self._from_app = asyncio.Queue(), asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self._lifespan = asyncio.create_task(self.app(scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "lifespan.startup"})
+        message = await self._from_app.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"Startup failed: {message}")
+
+    async def shutdown(self):
+        await self._to_app.put({"type": "lifespan.shutdown"})
+        await self._from_app.get()
+        await self._lifespan
+
+    async def request(self, method: str, path: str, **kwargs) -> ASGIResponse:
+        """
+        `kwargs` are passed to httpx.Request (json=, files=, data=, params=).
+        """
+        request = httpx.Request(method, f"http://bench{path}", **kwargs)
+        body = request.read()
+        url = urlsplit(str(request.url))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": url.path,
+            "raw_path": url.path.encode(),
+            "query_string": url.query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in request.headers.items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()  # Never disconnect
+
+        response = {"status": None, "headers": {}, "body": [], "ttfb": None, "chunks": 0}
+        start = time.perf_counter()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                if chunk:
+                    response["chunks"] += 1
+                    if response["ttfb"] is None:
+                        response["ttfb"] = time.perf_counter() - start
+                    response["body"].append(chunk)
+
+        await self.app(scope, receive, send)
+        return ASGIResponse(
+            status=response["status"],
+            headers=response["headers"],
+            body=b"".join(response["body"]),
+            ttfb=response["ttfb"],
+            total=time.perf_counter() - start,
+            chunks=response["chunks"],
+        )
@@ -0,0 +1,75 @@
+"""
+Chunking throughput and a sequence-length check: the old 300-word window
+vs. the token-aware Chunker. Every chunk is re-tokenized with special tokens
+and must fit the model's max sequence length; the run exits non-zero if any
+chunk would be truncated.
+
+    python -m benchmarks.bench_chunk --pages 200
+    python -m benchmarks.bench_chunk --pages 200 --model   # real tokenizer from EMBEDDING_MODEL
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.corpus import generate_pdf
+from services.chunker import Chunker, RegexTokenizer, SPECIAL_TOKENS
+from services.extractor import extract_pages
+
+
+def word_windows(text: str, max_length: int = 300, overlap: int = 50):
+    # The previous chunk_text, kept here as the baseline
+    words = text.split()
+    start = 0
+    while start < len(words):
+        yield " ".join(words[start:start + max_length])
+        start += max_length - overlap
+
+
+def _measure(label: str, chunk_iter) -> list:
+    start = time.perf_counter()
+    chunks = list(chunk_iter)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14}: {len(chunks)} chunks in {elapsed:.3f}s -> {len(chunks) / elapsed:.0f} chunks/sec")
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--words-per-page", type=int, default=600)
+    parser.add_argument("--cross-page", action="store_true")
+    parser.add_argument("--model", action="store_true", help="use the embedding model's tokenizer and max_seq_length")
+    args = parser.parse_args()
+
+    pages = list(extract_pages(generate_pdf(args.pages, words_per_page=args.words_per_page)))
+
+    if args.model:
+        from clients.registry import get_embedding_model
+        model = get_embedding_model()
+        chunker = Chunker.for_model(model, cross_page=args.cross_page)
+        max_seq_length = model.max_seq_length
+
+        def count_tokens(text):
+            return len(model.tokenizer(text, verbose=False)["input_ids"])
+    else:
+        max_seq_length = 512
+        chunker = Chunker(max_seq_length=max_seq_length, cross_page=args.cross_page)
+
+        def count_tokens(text):
+            return len(RegexTokenizer().offsets(text)) + SPECIAL_TOKENS
+
+    legacy = _measure("word windows", (chunk for page in pages for chunk in word_windows(page["text"])))
+    chunks = _measure("token-aware", chunker.iter_chunks(pages))
+
+    legacy_over = sum(count_tokens(text) > max_seq_length for text in legacy)
+    lengths = [count_tokens(text) for text, _ in chunks]
+    over = sum(length > max_seq_length for length in lengths)
+    print(f"word windows over {max_seq_length} tokens: {legacy_over}/{len(legacy)}")
+    print(f"token-aware  over {max_seq_length} tokens: {over}/{len(chunks)} (longest {max(lengths, default=0)})")
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
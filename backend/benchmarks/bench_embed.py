@@ -0,0 +1,51 @@
+"""
+Embedding throughput: the old per-page encode loop vs. the batched pipeline.
+Upserts go to an in-process fake index, so only chunking and encoding are measured.
+
+    python -m benchmarks.bench_embed --pages 100 --batch-size 64
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import generate_pdf
+from clients.fakes import FakeIndex
+from clients.registry import registry, get_embedding_model
+from services import embedder
+from services.chunker import Chunker
+from services.extractor import iter_pages
+
+
+def per_page_loop(pages) -> int:
+    chunker = Chunker.for_model(get_embedding_model())
+    chunks_encoded = 0
+    for page in pages:
+        chunks = [text for text, _ in chunker.iter_chunks([page])]
+        if chunks:
+            get_embedding_model().encode(chunks)
+            chunks_encoded += len(chunks)
+    return chunks_encoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--words-per-page", type=int, default=120)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    pdf = generate_pdf(args.pages, words_per_page=args.words_per_page)
+    registry.set("vector_store", FakeIndex())
+    get_embedding_model().encode(["warmup"])
+
+    start = time.perf_counter()
+    chunks = per_page_loop(iter_pages(pdf))
+    elapsed = time.perf_counter() - start
+    print(f"per-page loop : {chunks} chunks in {elapsed:.2f}s -> {chunks / elapsed:.1f} chunks/sec")
+
+    summary = embedder.embed_and_store(iter_pages(pdf), "bench", batch_size=args.batch_size)
+    print(f"batched (bs={args.batch_size}): {summary['vectors_stored']} chunks in {summary['elapsed_seconds']:.2f}s -> {summary['chunks_per_sec']:.1f} chunks/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Query embedding under load: 50 concurrent question encodes with every caller
+running its own forward pass (EMBED_SERVER_MODE=off) vs. the micro-batching
+embedding server, with and without a bulk ingestion running at the same time.
+The fake encoder charges a fixed cost per forward pass plus a small cost per
+text, which is roughly how a CPU transformer behaves for short inputs.
+
+    python -m benchmarks.bench_embed_server --concurrency 50 --modes off,thread,process
+"""
+
+import argparse
+import asyncio
+import functools
+import statistics
+import threading
+import time
+
+from clients.fakes import FakeEncoder
+from clients.registry import registry
+from services.embedding_server import INGEST, QUERY, EmbeddingServer, ProcessEncoder, create_embedding_server
+
+
+def build_server(mode: str, encoder_factory) -> EmbeddingServer:
+    if mode == "process":
+        return EmbeddingServer(ProcessEncoder(encoder_factory))
+    registry.set("embedding_model", encoder_factory())
+    return create_embedding_server(mode)
+
+
+def ingest(server: EmbeddingServer, batch_size: int, stop: threading.Event, counter: list):
+    texts = [f"ingested chunk {i} with some page text" for i in range(batch_size)]
+    while not stop.is_set():
+        server.encode(texts, INGEST)
+        counter[0] += batch_size
+
+
+async def run_queries(server: EmbeddingServer, concurrency: int, rounds: int) -> list:
+    latencies = []
+
+    async def client(n: int):
+        for r in range(rounds):
+            start = time.perf_counter()
+            await server.aencode([f"question {n} round {r} about the budget"], QUERY)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return latencies
+
+
+def measure(server: EmbeddingServer, args, with_ingest: bool) -> dict:
+    stop = threading.Event()
+    ingested = [0]
+    ingest_thread = None
+    if with_ingest:
+        ingest_thread = threading.Thread(target=ingest, args=(server, args.ingest_batch, stop, ingested), daemon=True)
+        ingest_thread.start()
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run_queries(server, args.concurrency, args.rounds))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if ingest_thread:
+        ingest_thread.join()
+
+    latencies.sort()
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "ingest_per_s": ingested[0] / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=["off", "thread"])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10, help="queries per concurrent client")
+    parser.add_argument("--call-latency", type=float, default=0.01, help="seconds per forward pass")
+    parser.add_argument("--item-latency", type=float, default=0.0005, help="seconds per text in a forward pass")
+    parser.add_argument("--ingest-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    # A partial of the class pickles, so it also works as the worker process factory
+    encoder_factory = functools.partial(FakeEncoder, latency_per_call=args.call_latency, latency_per_item=args.item_latency)
+
+    print(
+        f"{args.concurrency} concurrent clients x {args.rounds} queries, "
+        f"forward pass {args.call_latency * 1000:.1f} ms + {args.item_latency * 1000:.2f} ms/text"
+    )
+    for mode in args.modes:
+        for with_ingest in (False, True):
+            server = build_server(mode, encoder_factory)
+            try:
+                server.encode(["warmup"], QUERY)
+                result = measure(server, args, with_ingest)
+                stats = server.stats()
+            finally:
+                server.close()
+            print(
+                f"{mode:>7}{' + ingest' if with_ingest else '         '}: "
+                f"{result['qps']:7.1f} queries/s, p50 {result['p50_ms']:6.1f} ms, p95 {result['p95_ms']:6.1f} ms, "
+                f"avg batch {stats['avg_batch_size']:5.1f}"
+                + (f", ingest {result['ingest_per_s']:6.0f} chunks/s" if with_ingest else "")
+            )
+
+
+if __name__ == "__main__":
+    main()
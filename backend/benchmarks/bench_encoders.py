@@ -0,0 +1,79 @@
+"""
+Encode latency and memory per encoder backend. Each backend is loaded in a
+fresh process so peak RSS reflects that backend alone. Reports load time,
+single-query latency (the /ask-question path), throughput on ingestion-sized
+batches of chunk-length passages, and peak RSS.
+
+    python -m benchmarks.bench_encoders --model-dir models/bge-small-en-v1.5 --backends torch,torch-int8,onnx
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import statistics
+import time
+
+from benchmarks.check_encoder_parity import QUESTIONS, parity_corpus
+from benchmarks.suite import peak_rss_mb
+from clients.registry import EMBEDDING_MODEL_DIR, EMBEDDING_MODEL_NAME
+
+
+def run_backend(model: str, backend: str, onnx_file: str, queries: int, chunks: int, batch_size: int) -> dict:
+    from clients.encoders import create_encoder
+
+    baseline_rss = peak_rss_mb()["self"]
+    start = time.perf_counter()
+    encoder = create_encoder(model, backend, onnx_file=onnx_file)
+    load_seconds = time.perf_counter() - start
+    encoder.encode(["warmup"])
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        encoder.encode([QUESTIONS[i % len(QUESTIONS)]])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    passages = parity_corpus(chunks, seed=1)
+    start = time.perf_counter()
+    for offset in range(0, len(passages), batch_size):
+        encoder.encode(passages[offset:offset + batch_size], batch_size=batch_size)
+    ingest_seconds = time.perf_counter() - start
+
+    return {
+        "load_s": load_seconds,
+        "query_p50_ms": statistics.median(latencies) * 1000,
+        "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "chunks_per_s": len(passages) / ingest_seconds,
+        "peak_rss_mb": peak_rss_mb()["self"],
+        "model_rss_mb": peak_rss_mb()["self"] - baseline_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=EMBEDDING_MODEL_DIR, help="exported model directory (required for onnx)")
+    parser.add_argument("--backends", type=lambda s: s.split(","), default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--onnx-file", default="model.onnx")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    model = args.model_dir or EMBEDDING_MODEL_NAME
+    print(f"{model}: {args.queries} single queries, {args.chunks} passages in batches of {args.batch_size}")
+    for backend in args.backends:
+        # A fresh process per backend, so one backend's allocations don't inflate the next one's RSS
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(
+                run_backend, model, backend, args.onnx_file, args.queries, args.chunks, args.batch_size
+            ).result()
+        print(
+            f"{backend:>10}: load {result['load_s']:5.1f} s, query p50 {result['query_p50_ms']:6.1f} ms "
+            f"p95 {result['query_p95_ms']:6.1f} ms, ingest {result['chunks_per_s']:7.1f} chunks/s, "
+            f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['model_rss_mb']:.1f} MB for the model)"
+        )
+
+
+if __name__ == "__main__":
+    main()
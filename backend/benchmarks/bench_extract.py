@@ -0,0 +1,43 @@
+"""
+Page extraction throughput: sequential generator vs. process pool.
+
+    python -m benchmarks.bench_extract --pages 300 --workers 4
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import generate_pdf
+from services.extractor import iter_pages, iter_pages_parallel
+
+
+def _measure(pages_iter) -> tuple[int, float]:
+    start = time.perf_counter()
+    count = 0
+    last_page = 0
+    for page in pages_iter:
+        assert page["page"] > last_page, "pages must stay in order"
+        last_page = page["page"]
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pages-per-task", type=int, default=16)
+    parser.add_argument("--window", type=int, default=8)
+    args = parser.parse_args()
+
+    pdf = generate_pdf(args.pages)
+
+    count, elapsed = _measure(iter_pages(pdf))
+    print(f"1 worker : {count} pages in {elapsed:.2f}s -> {count / elapsed:.1f} pages/sec")
+
+    count, elapsed = _measure(iter_pages_parallel(pdf, workers=args.workers, pages_per_task=args.pages_per_task, window=args.window))
+    print(f"{args.workers} workers: {count} pages in {elapsed:.2f}s -> {count / elapsed:.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Multi-document retrieval: querying N namespaces one after another vs. the
+concurrent fan-out with a heap merge used by `file_ids` questions, against a
+fake Pinecone index with per-request latency. Also reports time-to-first-token
+of a full multi-document answer with a fake streaming LLM.
+
+    python -m benchmarks.bench_multi_doc --docs 1,10,50 --index-latency 0.05
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from clients.fakes import FakeEncoder, FakeIndex, FakeStreamingLLM
+from clients.registry import registry
+from services import llama_query
+from services.vector_store import PineconeVectorStore, merge_top_k
+
+
+def seed_index(index: FakeIndex, docs: int, chunks_per_doc: int, dim: int, rng: np.random.Generator) -> list:
+    file_ids = [f"bench-doc-{i}" for i in range(docs)]
+    for file_id in file_ids:
+        vectors = rng.standard_normal((chunks_per_doc, dim)).astype(np.float32)
+        index.namespaces[file_id] = {
+            f"{file_id}#c{j}": {"id": f"{file_id}#c{j}", "values": vectors[j].tolist(), "metadata": {"text": f"{file_id} chunk {j}"}}
+            for j in range(chunks_per_doc)
+        }
+    return file_ids
+
+
+def sequential(file_ids, vector) -> list:
+    # Baseline: one namespace at a time, then the same merge
+    results = [llama_query._retrieve_matches(file_id, vector) for file_id in file_ids]
+    return merge_top_k(results, llama_query.RETRIEVAL_TOP_K)
+
+
+async def first_token(file_ids, question: str) -> float:
+    start = time.perf_counter()
+    stream = llama_query.ask_question_stream(file_ids, question)
+    try:
+        await stream.__anext__()
+        return time.perf_counter() - start
+    finally:
+        await stream.aclose()
+
+
+async def measure(file_ids, vector, repeats: int) -> dict:
+    timings = {"sequential": [], "concurrent": [], "ttft": []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await asyncio.to_thread(sequential, file_ids, vector)
+        timings["sequential"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await llama_query._retrieve_context(file_ids, vector)
+        timings["concurrent"].append(time.perf_counter() - start)
+
+        timings["ttft"].append(await first_token(file_ids, "What do these documents say about the budget?"))
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 50])
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--index-latency", type=float, default=0.05, help="seconds per namespace query")
+    parser.add_argument("--llm-first-token", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    encoder = FakeEncoder()
+    index = FakeIndex(latency=args.index_latency)
+    registry.set("embedding_model", encoder)
+    registry.set("vector_store", PineconeVectorStore(index))
+    registry.set("llm", FakeStreamingLLM(tokens=20, first_token_latency=args.llm_first_token, token_latency=0.0))
+
+    rng = np.random.default_rng(0)
+    file_ids = seed_index(index, max(args.docs), args.chunks_per_doc, encoder.dim, rng)
+    vector = rng.standard_normal(encoder.dim).astype(np.float32)
+
+    print(f"index latency {args.index_latency * 1000:.0f} ms/query, {args.chunks_per_doc} chunks/doc, median of {args.repeats}")
+    for docs in args.docs:
+        result = asyncio.run(measure(file_ids[:docs], vector, args.repeats))
+        print(
+            f"{docs:>3} docs: sequential {result['sequential'] * 1000:7.1f} ms, "
+            f"concurrent {result['concurrent'] * 1000:7.1f} ms "
+            f"({result['sequential'] / result['concurrent']:.1f}x), "
+            f"first token {result['ttft'] * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Bytes on the wire, writes and CPU per streamed answer on /ask-question: the
+previous framing (one `data:` event per LLM delta) vs. coalesced events, with
+and without gzip. Requests go through the app in-process (middleware and
+StreamingResponse included) with a fake streaming LLM and stubbed retrieval.
+Every body message counts as one write, as uvicorn sends one per message.
+
+    python -m benchmarks.bench_sse --answers 50 --tokens 400 --token-latency 0.005
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import zlib
+
+from benchmarks.asgi import ASGIClient
+from clients.fakes import FakeEncoder, FakeStreamingLLM
+from clients.registry import registry
+from services import llama_query
+
+TOKEN = "word "
+
+
+async def legacy_events(chunks):
+    # The framing before coalescing: one event per delta
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+
+def answer_text(body: bytes, gzipped: bool) -> str:
+    if gzipped:
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    text = []
+    for line in body.decode().split("\n"):
+        if line.startswith("data: "):
+            text.append(json.loads(line[6:]).get("chunk", ""))
+    return "".join(text)
+
+
+async def measure(client: ASGIClient, variant: str, answers: int, expected: str) -> dict:
+    cpu = time.process_time()
+    # A file id per answer, so none are served from the answer cache
+    responses = await asyncio.gather(*(
+        client.request(
+            "POST", "/ask-question",
+            json={"file_id": f"bench-{variant}-{i}", "question": "Summarize this document"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        for i in range(answers)
+    ))
+    cpu = time.process_time() - cpu
+
+    for response in responses:
+        gzipped = response.headers.get("content-encoding") == "gzip"
+        if response.status != 200 or answer_text(response.body, gzipped) != expected:
+            raise RuntimeError(f"{variant}: unexpected response ({response.status})")
+    return {
+        "wire_bytes": statistics.mean(len(r.body) for r in responses),
+        "writes": statistics.mean(r.chunks for r in responses),
+        "ttfb_ms": statistics.median(r.ttfb for r in responses) * 1000,
+        "cpu_ms": cpu / answers * 1000,
+        "content_type": responses[0].headers.get("content-type"),
+    }
+
+
+async def run(args):
+    import main
+    from routes import ask_question
+
+    client = ASGIClient(main.app)
+    await client.startup()
+    expected = TOKEN * args.tokens
+    coalesced, gzip_enabled = ask_question.answer_events, ask_question.SSE_GZIP
+    try:
+        for variant in ("per-delta", "coalesced", "coalesced+gzip"):
+            ask_question.answer_events = legacy_events if variant == "per-delta" else coalesced
+            ask_question.SSE_GZIP = variant == "coalesced+gzip"
+            result = await measure(client, variant, args.answers, expected)
+            print(
+                f"{variant:>15}: {result['wire_bytes']:8.0f} bytes/answer, {result['writes']:5.0f} writes/answer, "
+                f"CPU {result['cpu_ms']:6.2f} ms/answer, ttfb {result['ttfb_ms']:6.1f} ms ({result['content_type']})"
+            )
+    finally:
+        ask_question.answer_events, ask_question.SSE_GZIP = coalesced, gzip_enabled
+        await client.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=50, help="concurrent answers")
+    parser.add_argument("--tokens", type=int, default=400, help="LLM deltas per answer")
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--first-token", type=float, default=0.1)
+    args = parser.parse_args()
+
+    registry.set("embedding_model", FakeEncoder())
+    registry.set("llm", FakeStreamingLLM(tokens=args.tokens, first_token_latency=args.first_token, token_latency=args.token_latency, token=TOKEN))
+    llama_query._retrieve_matches = lambda file_id, question_vector: [
+        {"id": "bench", "score": 1.0, "metadata": {"text": "Benchmark context about the document."}}
+    ]
+
+    print(f"{args.answers} concurrent answers x {args.tokens} deltas of {len(TOKEN)} chars, {args.token_latency * 1000:.1f} ms apart")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Time-to-first-byte and total latency of ask_question_stream with a fake
+streaming LLM and a stubbed retrieval step.
+
+The previous implementation waited for the full completion and then replayed
+it one character every 20 ms; its numbers are derived from the same run.
+
+    python -m benchmarks.bench_stream --tokens 400 --first-token 0.3 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import time
+
+from clients.fakes import FakeEncoder, FakeStreamingLLM
+from clients.registry import registry
+from services import llama_query
+
+LEGACY_CHAR_DELAY = 0.02
+
+
+async def _run(question: str) -> tuple[float, float, str]:
+    start = time.perf_counter()
+    first = None
+    answer = []
+    async for token in llama_query.ask_question_stream("bench-file", question):
+        if first is None:
+            first = time.perf_counter() - start
+        answer.append(token)
+    return first, time.perf_counter() - start, "".join(answer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--retrieval-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    registry.set("embedding_model", FakeEncoder())
+    registry.set("llm", FakeStreamingLLM(tokens=args.tokens, first_token_latency=args.first_token, token_latency=args.token_latency))
+
+    def fake_retrieve(file_id, question_vector):
+        time.sleep(args.retrieval_latency)
+        return [{"id": "bench", "score": 1.0, "metadata": {"text": "Benchmark context about the document."}}]
+
+    llama_query._retrieve_matches = fake_retrieve
+
+    ttfb, total, answer = asyncio.run(_run("Summarize this document"))
+    print(f"streaming : ttfb {ttfb * 1000:.0f} ms, total {total * 1000:.0f} ms, {len(answer)} chars")
+
+    legacy_ttfb = total
+    legacy_total = total + len(answer) * LEGACY_CHAR_DELAY
+    print(f"char replay (previous): ttfb {legacy_ttfb * 1000:.0f} ms, total {legacy_total * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
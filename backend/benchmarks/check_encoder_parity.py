@@ -0,0 +1,92 @@
+"""
+Parity of the faster encoder backends with the fp32 SentenceTransformer on a
+fixed corpus of generated passages (short to longer than max_seq_length) and
+questions. Reports the cosine similarity of each text's embedding to its
+fp32 embedding, and whether each question still retrieves the same top passage.
+
+    python -m benchmarks.check_encoder_parity --model-dir models/bge-small-en-v1.5 --backends torch-int8,onnx
+
+Exits non-zero if any backend's minimum cosine is below --threshold.
+"""
+
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from benchmarks.corpus import WORDS
+from clients.encoders import create_encoder
+from clients.registry import EMBEDDING_MODEL_DIR, EMBEDDING_MODEL_NAME
+
+QUESTIONS = [
+    "How much notice is needed to terminate the contract?",
+    "When must employees finish onboarding training?",
+    "How did revenue and operating costs change?",
+    "How was the model evaluated?",
+    "What equipment is required in the laboratory?",
+    "What is the capital of France?",
+]
+
+
+def parity_corpus(passages: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(passages):
+        # Mostly chunk-sized passages, some beyond the model's 512 tokens to cover truncation
+        length = rng.choice((8, 30, 120, 250, 700))
+        words = [rng.choice(WORDS) for _ in range(length)]
+        texts.append(" ".join(words).capitalize() + ".")
+    return texts
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def top_passages(questions: np.ndarray, passages: np.ndarray) -> np.ndarray:
+    return np.argmax(questions @ passages.T, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=EMBEDDING_MODEL_DIR, help="exported model directory (required for onnx)")
+    parser.add_argument("--backends", type=lambda s: s.split(","), default=["torch-int8", "onnx"])
+    parser.add_argument("--onnx-file", default="model.onnx")
+    parser.add_argument("--passages", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.99, help="minimum cosine to the fp32 embedding")
+    args = parser.parse_args()
+
+    model = args.model_dir or EMBEDDING_MODEL_NAME
+    passages = parity_corpus(args.passages)
+
+    reference = create_encoder(model, "torch")
+    ref_passages = np.asarray(reference.encode(passages), dtype=np.float32)
+    ref_questions = np.asarray(reference.encode(QUESTIONS), dtype=np.float32)
+    ref_top = top_passages(ref_questions, ref_passages)
+    del reference
+
+    print(f"{len(passages)} passages + {len(QUESTIONS)} questions, reference: torch fp32 {model}")
+    failures = 0
+    for backend in args.backends:
+        encoder = create_encoder(model, backend, onnx_file=args.onnx_file)
+        cand_passages = np.asarray(encoder.encode(passages), dtype=np.float32)
+        cand_questions = np.asarray(encoder.encode(QUESTIONS), dtype=np.float32)
+        del encoder
+
+        cosines = np.concatenate([cosine_rows(ref_passages, cand_passages), cosine_rows(ref_questions, cand_questions)])
+        same_top = int((top_passages(cand_questions, cand_passages) == ref_top).sum())
+        ok = cosines.min() >= args.threshold
+        failures += not ok
+        print(
+            f"{backend:>10}: cosine min {cosines.min():.5f}, mean {cosines.mean():.5f}, "
+            f"same top passage {same_top}/{len(QUESTIONS)}  {'OK' if ok else 'BELOW THRESHOLD'}"
+        )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare two benchmark suite result files and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json --threshold 10
+
+Exits non-zero if any metric got worse by more than --threshold percent.
+"""
+
+import argparse
+import json
+import sys
+
+# (path into the results, True if higher is better)
+METRICS = [
+    (("ingestion", "pages_per_sec"), True),
+    (("ingestion", "chunks_per_sec"), True),
+    (("queries", "requests_per_sec"), True),
+    (("queries", "ttfb_ms", "p50"), False),
+    (("queries", "ttfb_ms", "p95"), False),
+    (("queries", "ttfb_ms", "p99"), False),
+    (("queries", "latency_ms", "p50"), False),
+    (("queries", "latency_ms", "p95"), False),
+    (("queries", "latency_ms", "p99"), False),
+    (("chat", "append_ms", "p50"), False),
+    (("chat", "append_ms", "p95"), False),
+    (("chat", "append_ms", "p99"), False),
+    (("peak_rss_mb", "self"), False),
+    (("peak_rss_mb", "children"), False),
+]
+
+
+def _lookup(results: dict, path):
+    for key in path:
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression, percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get("config") != candidate.get("config"):
+        print("warning: the runs used different configurations")
+    print(f"{'metric':<28} {baseline.get('commit', '?')[:10]:>12} {candidate.get('commit', '?')[:10]:>12} {'change':>9}")
+
+    regressions = 0
+    for path, higher_is_better in METRICS:
+        old, new = _lookup(baseline, path), _lookup(candidate, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{'.'.join(path):<28} {old:>12} {new:>12} {change:>+8.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
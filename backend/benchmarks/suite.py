@@ -0,0 +1,277 @@
+"""
+Offline end-to-end benchmark suite.
+
+Drives the real FastAPI app in-process, with Supabase, the Pinecone index,
+the Groq LLM and the embedding model replaced by the fakes in clients/fakes.py
+(each with configurable latency). It measures:
+
+- ingestion: generated PDFs of several sizes through /pdf-upload and the job
+  queue, reporting pages/sec and chunks/sec
+- queries: concurrent /ask-question requests, reporting time-to-first-byte
+  and total latency percentiles
+- chat: concurrent /chat/message appends, reporting latency percentiles
+- peak RSS of this process and of its children (extraction workers)
+- per-stage timings from the app's stage_duration_seconds histogram
+
+Results are written as JSON (default benchmarks/results/<commit>.json);
+compare two runs with `python -m benchmarks.compare OLD.json NEW.json`.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 1,10,50 --queries 200 --concurrency 20 --llm-first-token 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.asgi import ASGIClient
+from benchmarks.corpus import WORDS, generate_corpus
+from clients.fakes import FakeEncoder, FakeIndex, FakeStreamingLLM, FakeSupabase
+from clients.registry import registry
+from services.metrics import stage_seconds
+from services.telemetry import configure_logging
+from services.vector_store import PineconeVectorStore
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+QUESTION_TEMPLATES = (
+    "Summarize what this document says about {0} and {1}",
+    "What does the pdf say about {0} {1} {2}?",
+    "What is {0} {1}?",
+    "List the {0} requirements for {1} {2}",
+    "How are {0} and {1} related to {2}?",
+)
+
+
+def report(message: str):
+    # Stray output on stdout is silenced unless --verbose; the report is not
+    print(message, file=sys.__stdout__, flush=True)
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50) * 1000, 2),
+        "p95": round(float(p95) * 1000, 2),
+        "p99": round(float(p99) * 1000, 2),
+        "mean": round(float(np.mean(values)) * 1000, 2),
+    }
+
+
+def install_fakes(args) -> dict:
+    fakes = {
+        "supabase": FakeSupabase(latency=args.db_latency),
+        "index": FakeIndex(latency=args.index_latency),
+        "llm": FakeStreamingLLM(tokens=args.llm_tokens, first_token_latency=args.llm_first_token, token_latency=args.llm_token_latency),
+        "encoder": FakeEncoder(latency_per_item=args.encode_latency),
+    }
+    registry.set("supabase", fakes["supabase"])
+    registry.set("pinecone_index", fakes["index"])
+    registry.set("vector_store", PineconeVectorStore(fakes["index"]))
+    registry.set("llm", fakes["llm"])
+    registry.set("embedding_model", fakes["encoder"])
+    return fakes
+
+
+async def bench_ingestion(client: ASGIClient, sizes) -> dict:
+    corpus = generate_corpus(sizes)
+    documents = []
+    for pages, pdf in corpus.items():
+        start = time.perf_counter()
+        response = await client.request("POST", "/pdf-upload", files={"file": (f"bench-{pages}.pdf", pdf, "application/pdf")})
+        if response.status != 200:
+            raise RuntimeError(f"Upload failed ({response.status}): {response.body[:200]}")
+        upload = response.json()
+
+        job = {"status": upload["status"], "result": None}
+        while job["status"] not in ("done", "failed"):
+            await asyncio.sleep(0.01)
+            job = (await client.request("GET", f"/jobs/{upload['job_id']}")).json()
+        if job["status"] == "failed":
+            raise RuntimeError(f"Ingestion of {pages} pages failed: {job['error']}")
+
+        elapsed = time.perf_counter() - start
+        chunks = job["result"]["vectors_stored"]
+        documents.append({
+            "file_id": upload["file_id"],
+            "document_id": upload["document_id"],
+            "pages": pages,
+            "chunks": chunks,
+            "bytes": len(pdf),
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(pages / elapsed, 1),
+            "chunks_per_sec": round(chunks / elapsed, 1),
+        })
+        report(f"ingest {pages:>4} pages: {elapsed:.2f}s, {pages / elapsed:.1f} pages/sec, {chunks / elapsed:.1f} chunks/sec")
+
+    total_seconds = sum(d["seconds"] for d in documents)
+    return {
+        "documents": documents,
+        "pages_per_sec": round(sum(d["pages"] for d in documents) / total_seconds, 1),
+        "chunks_per_sec": round(sum(d["chunks"] for d in documents) / total_seconds, 1),
+    }
+
+
+async def bench_queries(client: ASGIClient, file_ids, count: int, concurrency: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    questions = [
+        (rng.choice(file_ids), rng.choice(QUESTION_TEMPLATES).format(*rng.sample(WORDS, 3)))
+        for _ in range(count)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfb, totals, errors = [], [], 0
+
+    async def ask(file_id, question):
+        nonlocal errors
+        async with semaphore:
+            response = await client.request("POST", "/ask-question", json={"file_id": file_id, "question": question})
+        if response.status != 200 or b'"error"' in response.body:
+            errors += 1
+            return
+        ttfb.append(response.ttfb)
+        totals.append(response.total)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(file_id, question) for file_id, question in questions))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "requests": count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_sec": round(count / elapsed, 2),
+        "ttfb_ms": percentiles(ttfb),
+        "latency_ms": percentiles(totals),
+    }
+    report(f"ask-question: {count} requests at concurrency {concurrency}: ttfb {result['ttfb_ms']}, total {result['latency_ms']}")
+    return result
+
+
+async def bench_chat(client: ASGIClient, document: dict, count: int, concurrency: int) -> dict:
+    chat = (await client.request("POST", "/chat/create", json={
+        "title": "bench", "pdf_document_id": document["document_id"], "file_id": document["file_id"]
+    })).json()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def send(i):
+        async with semaphore:
+            response = await client.request("POST", "/chat/message", json={"chat_id": chat["id"], "content": f"message {i}", "sender": "user"})
+        if response.status == 200:
+            latencies.append(response.total)
+
+    await asyncio.gather(*(send(i) for i in range(count)))
+    history = await client.request("GET", f"/chat/{chat['id']}")
+    result = {"requests": count, "concurrency": concurrency, "append_ms": percentiles(latencies), "history_ms": round(history.total * 1000, 2)}
+    report(f"chat/message: {count} appends at concurrency {concurrency}: {result['append_ms']}")
+    return result
+
+
+def peak_rss_mb() -> dict:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def git_revision() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+async def run(args) -> dict:
+    fakes = install_fakes(args)
+    import main  # After the fakes are in place
+    configure_logging(level="INFO" if args.verbose else "WARNING")
+
+    client = ASGIClient(main.app)
+    await client.startup()
+    try:
+        ingestion = await bench_ingestion(client, args.sizes)
+        file_ids = [d["file_id"] for d in ingestion["documents"]]
+        queries = await bench_queries(client, file_ids, args.queries, args.concurrency)
+        chat = await bench_chat(client, ingestion["documents"][0], args.chat_messages, args.concurrency)
+        health = (await client.request("GET", "/health")).json()
+        metrics = await client.request("GET", "/metrics")
+        if metrics.status != 200:
+            raise RuntimeError(f"/metrics failed ({metrics.status})")
+    finally:
+        await client.shutdown()
+
+    return {
+        "ingestion": ingestion,
+        "queries": queries,
+        "chat": chat,
+        "caches": health.get("caches"),
+        "stages": stage_seconds.summary(),
+        "database_calls": fakes["supabase"].calls,
+        "llm_calls": fakes["llm"].calls,
+    }
+
+
+def run_quietly(args) -> dict:
+    if args.verbose:
+        return asyncio.run(run(args))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(run(args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 50, 200], help="page counts of the generated PDFs")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--chat-messages", type=int, default=200)
+    parser.add_argument("--db-latency", type=float, default=0.01, help="seconds per Supabase call")
+    parser.add_argument("--index-latency", type=float, default=0.02, help="seconds per Pinecone call")
+    parser.add_argument("--encode-latency", type=float, default=0.001, help="seconds per encoded text")
+    parser.add_argument("--llm-first-token", type=float, default=0.3)
+    parser.add_argument("--llm-token-latency", type=float, default=0.005)
+    parser.add_argument("--llm-tokens", type=int, default=100)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--verbose", action="store_true", help="keep the service's own log output")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    results = {
+        **revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "verbose")},
+        **run_quietly(args),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    report(f"peak RSS: {results['peak_rss_mb']} MB")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = "-dirty" if revision["dirty"] else ""
+        output = os.path.join(RESULTS_DIR, f"{revision['commit'][:12]}{suffix}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    report(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Embedding Encoder Backends
+
+Every backend exposes the subset of the SentenceTransformer interface the
+backend uses: `encode(texts, batch_size=..., convert_to_numpy=True)`,
+`tokenizer` (for the chunker) and `max_seq_length`. `ModelTokenizer` has just
+the last two, for processes that chunk but don't run the model.
+
+EMBEDDING_BACKEND:
+- torch (default): SentenceTransformer in fp32
+- torch-int8: the same model with its Linear layers dynamically quantized to int8
+- onnx: ONNX Runtime on an exported model directory (see `export_onnx`), with the
+  tokenizer, pooling and normalization read from the same directory
+
+Export a model for the onnx backend (add --quantize for an int8 model_quantized.onnx):
+
+    python -m clients.encoders --model BAAI/bge-small-en-v1.5 --output models/bge-small-en-v1.5
+"""
+
+import argparse
+import json
+import os
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Model file inside the model directory used by the onnx backend
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "model.onnx")
+# Intra-op threads for the forward pass; 0 leaves the library default
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Padded tokens per ONNX Runtime run. The exported graph materializes the full
+# attention matrix, so a batch of 64 x 512 tokens would need gigabytes; larger
+# batches are run in slices of at most this many tokens.
+EMBEDDING_ONNX_MAX_TOKENS = int(os.getenv("EMBEDDING_ONNX_MAX_TOKENS", "8192"))
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+_POOLING_TYPE = "sentence_transformers.models.Pooling"
+_NORMALIZE_TYPE = "sentence_transformers.models.Normalize"
+
+
+def create_encoder(model: str, backend: str = EMBEDDING_BACKEND, onnx_file: str = EMBEDDING_ONNX_FILE):
+    """
+    Load `model` (a hub name or a local directory; onnx needs a directory)
+    with the given backend. Called once per process through the registry.
+    """
+    if backend == "torch":
+        return _load_torch(model)
+    if backend == "torch-int8":
+        return _load_torch_int8(model)
+    if backend == "onnx":
+        return OnnxEncoder(model, onnx_file)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def _load_torch(model: str):
+    from sentence_transformers import SentenceTransformer
+
+    if EMBEDDING_THREADS:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+    return SentenceTransformer(model, device="cpu")
+
+
+def _load_torch_int8(model: str):
+    import torch
+
+    encoder = _load_torch(model)
+    # Weights are stored as int8 and activations quantized on the fly; pooling
+    # and normalization are untouched, so the output stays a float32 embedding
+    torch.ao.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return encoder
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str, onnx_file: str = EMBEDDING_ONNX_FILE):
+        """
+        Load an exported model directory: the ONNX graph of the transformer plus
+        the tokenizer and sentence-transformers module configs saved beside it.
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        if not os.path.isdir(model_dir):
+            raise ValueError(f"EMBEDDING_BACKEND=onnx needs a local model directory (EMBEDDING_MODEL_DIR), got {model_dir!r}")
+
+        options = onnxruntime.SessionOptions()
+        if EMBEDDING_THREADS:
+            options.intra_op_num_threads = EMBEDDING_THREADS
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, onnx_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        modules = _read_json(model_dir, "modules.json") or []
+        pooling_dir = next((m["path"] for m in modules if m.get("type") == _POOLING_TYPE), None)
+        pooling = _read_json(os.path.join(model_dir, pooling_dir), "config.json") if pooling_dir else None
+        self.pooling = _pooling_mode(pooling)
+        self.normalize = any(m.get("type") == _NORMALIZE_TYPE for m in modules)
+        self.max_seq_length = _max_seq_length(model_dir, self.tokenizer)
+
+    def encode(
+        self,
+        texts: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        embeddings = None
+        # Longest first, like SentenceTransformer, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            pooled = self._forward([texts[i] for i in rows])
+            if embeddings is None:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[rows] = pooled
+        if embeddings is None:
+            embeddings = np.empty((0, 0), dtype=np.float32)
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+        return embeddings[0] if single else embeddings
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        mask = encoded["attention_mask"].astype(np.int64)
+        feed = {}
+        for name in self._input_names:
+            if name in encoded:
+                feed[name] = encoded[name].astype(np.int64)
+            elif name == "token_type_ids":
+                feed[name] = np.zeros_like(mask)
+
+        step = max(1, EMBEDDING_ONNX_MAX_TOKENS // mask.shape[1])
+        pooled = []
+        for start in range(0, len(texts), step):
+            rows = slice(start, start + step)
+            length = mask.shape[1]
+            if self.tokenizer.padding_side == "right":
+                # Each slice can drop the padding columns none of its texts use
+                length = int(mask[rows].sum(axis=1).max())
+            hidden = self.session.run(None, {name: value[rows, :length] for name, value in feed.items()})[0]
+            pooled.append(_pool(hidden, mask[rows, :length], self.pooling))
+        return np.concatenate(pooled)
+
+
+class ModelTokenizer:
+    def __init__(self, model: str):
+        """
+        The tokenizer and max_seq_length of `model` (a hub name or a local
+        directory) without its weights.
+        """
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.max_seq_length = _max_seq_length(model, self.tokenizer)
+
+
+def _max_seq_length(model: str, tokenizer) -> int:
+    if os.path.isdir(model):
+        config = _read_json(model, "sentence_bert_config.json")
+    else:
+        try:
+            from huggingface_hub import hf_hub_download
+            config = _read_json(*os.path.split(hf_hub_download(model, "sentence_bert_config.json")))
+        except Exception:
+            config = None
+    return (config or {}).get("max_seq_length", tokenizer.model_max_length)
+
+
+def _read_json(directory: str, name: str) -> Optional[dict]:
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _pooling_mode(config: Optional[dict]) -> str:
+    if not config:
+        return "mean"
+    for mode in ("cls", "mean", "max"):
+        if config.get(f"pooling_mode_{mode}_token") or config.get(f"pooling_mode_{mode}_tokens"):
+            return mode
+    raise ValueError(f"Unsupported pooling config: {config}")
+
+
+def _pool(hidden: np.ndarray, mask: np.ndarray, mode: str) -> np.ndarray:
+    if mode == "cls":
+        return hidden[:, 0].astype(np.float32)
+    weights = mask[:, :, None].astype(np.float32)
+    if mode == "max":
+        return np.where(weights > 0, hidden, -1e9).max(axis=1).astype(np.float32)
+    return ((hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+def export_onnx(model: str, output_dir: str, quantize: bool = False, opset: int = 17) -> str:
+    """
+    Save `model` with its tokenizer and configs to `output_dir` and export its
+    transformer to `output_dir/model.onnx` (plus `model_quantized.onnx`, with
+    int8 weights, if `quantize`). Returns the directory.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    encoder = SentenceTransformer(model, device="cpu")
+    encoder.save(output_dir)
+    transformer = encoder[0].auto_model.eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, *inputs):
+            return self.wrapped(*inputs)[0]
+
+    sample = encoder.tokenizer(["An example sentence to trace the graph."], return_tensors="pt")
+    # BERT-style forward(input_ids, attention_mask, token_type_ids) order
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, os.path.join(output_dir, "model_quantized.onnx"), weight_type=QuantType.QInt8)
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"))
+    parser.add_argument("--output", required=True, help="model directory to write")
+    parser.add_argument("--quantize", action="store_true", help="also write model_quantized.onnx with int8 weights")
+    args = parser.parse_args()
+
+    export_onnx(args.model, args.output, quantize=args.quantize)
+    print(f"Exported {args.model} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+In-process stand-ins for the external services, for tests and offline runs.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from clients.supabase_client import DatabaseError
+
+
+class FakeIndex:
+    """
+    Mimics the subset of the Pinecone Index API the backend uses.
+    `latency` is added to every request; `fail_times` makes the next N upserts raise.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_times: int = 0):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.namespaces = {}
+        self.upsert_calls = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace: str = ""):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.upsert_calls += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("Simulated upsert failure")
+            store = self.namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                store[vector["id"]] = vector
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k: int = 5, namespace: str = "", include_metadata: bool = True):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            stored = list(self.namespaces.get(namespace, {}).values())
+        if not stored:
+            return {"matches": []}
+        matrix = np.asarray([v["values"] for v in stored], dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        top = np.argsort(-scores)[:top_k]
+        return {
+            "matches": [
+                {"id": stored[i]["id"], "score": float(scores[i]), "metadata": stored[i].get("metadata", {}) if include_metadata else {}}
+                for i in top
+            ]
+        }
+
+    def delete(self, delete_all: bool = False, namespace: str = ""):
+        with self._lock:
+            self.namespaces.pop(namespace, None)
+
+    def count(self, namespace: str = "") -> int:
+        with self._lock:
+            return len(self.namespaces.get(namespace, {}))
+
+
+class FakeEncoder:
+    """
+    Deterministic stand-in for the SentenceTransformer: hashes tokens into a
+    normalized bag-of-words vector, so similar texts get similar embeddings.
+    `latency_per_item` and `latency_per_call` simulate forward-pass cost.
+    """
+
+    max_seq_length = 512
+
+    def __init__(self, dim: int = 384, latency_per_item: float = 0.0, latency_per_call: float = 0.0):
+        self.dim = dim
+        self.latency_per_item = latency_per_item
+        self.latency_per_call = latency_per_call
+        self.calls = 0
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        self.calls += 1
+        if self.latency_per_item or self.latency_per_call:
+            time.sleep(self.latency_per_call + self.latency_per_item * len(texts))
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                embeddings[row, zlib.crc32(token.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+
+class FakeChatChunk:
+    def __init__(self, delta: str, text: str):
+        self.delta = delta
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class FakeStreamingLLM:
+    """
+    Mimics the Groq LLM's achat/astream_chat: waits `first_token_latency`
+    seconds, then emits `tokens` tokens `token_latency` seconds apart.
+    """
+
+    def __init__(self, tokens: int = 200, first_token_latency: float = 0.3, token_latency: float = 0.01, token: str = "word "):
+        self.tokens = tokens
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.token = token
+        self.calls = 0
+
+    async def astream_chat(self, messages):
+        self.calls += 1
+
+        async def generate():
+            await asyncio.sleep(self.first_token_latency)
+            text = ""
+            for i in range(self.tokens):
+                if i and self.token_latency:
+                    await asyncio.sleep(self.token_latency)
+                text += self.token
+                yield FakeChatChunk(self.token, text)
+
+        return generate()
+
+    async def achat(self, messages):
+        text = ""
+        async for chunk in await self.astream_chat(messages):
+            text = chunk.text
+        return FakeChatChunk("", text)
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for clients.supabase_client.AsyncSupabase: tables are
+    lists of dicts, storage is a dict of bytes. Fills in ids and timestamps
+    like the database defaults and cascades chat deletes to messages.
+    `latency` is awaited on every call to simulate a network round trip.
+    """
+
+    _TIMESTAMPS = {"chats": ("created_at", "updated_at")}
+    _CASCADES = {"chats": [("messages", "chat_id")]}
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables = {}
+        self.objects = {}
+        self.calls = 0
+
+    async def aclose(self):
+        pass
+
+    async def select(self, table, columns="*", filters=(), order=(), limit=None, count=False, after=None):
+        await self._round_trip()
+        rows = [row for row in self.tables.get(table, []) if _matches_all(row, filters)]
+        if after is not None:
+            rows = [row for row in rows if _sorts_after(row, order, after)]
+        total = len(rows) if count else None
+        for column, desc in reversed(order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse=desc)
+        if limit is not None:
+            rows = rows[:limit]
+        return [_project(row, columns) for row in rows], total
+
+    async def insert(self, table, rows):
+        await self._round_trip()
+        now = _now()
+        inserted = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            row = {"id": str(uuid.uuid4()), "created_at": now, **copy.deepcopy(row)}
+            for column in self._TIMESTAMPS.get(table, ()):
+                row.setdefault(column, now)
+            self.tables.setdefault(table, []).append(row)
+            inserted.append(dict(row))
+        return inserted
+
+    async def update(self, table, values, filters):
+        await self._round_trip()
+        updated = []
+        for row in self.tables.get(table, []):
+            if _matches_all(row, filters):
+                row.update(copy.deepcopy(values))
+                updated.append(dict(row))
+        return updated
+
+    async def delete(self, table, filters):
+        await self._round_trip()
+        kept, deleted = [], []
+        for row in self.tables.get(table, []):
+            (deleted if _matches_all(row, filters) else kept).append(row)
+        self.tables[table] = kept
+        for child, column in self._CASCADES.get(table, ()):
+            ids = {row["id"] for row in deleted}
+            self.tables[child] = [row for row in self.tables.get(child, []) if row.get(column) not in ids]
+        return deleted
+
+    async def rpc(self, function, params):
+        await self._round_trip()
+        handler = getattr(self, f"_rpc_{function}", None)
+        if handler is None:
+            raise DatabaseError(404, f"Could not find the function {function}", "PGRST202")
+        return handler(**params)
+
+    # Database functions from SETUP_GUIDE.md
+
+    def _rpc_append_message(self, p_chat_id, p_content, p_sender, p_touch=True):
+        chat = next((row for row in self.tables.get("chats", []) if row["id"] == p_chat_id), None)
+        if chat is None:
+            raise DatabaseError(404, "Chat not found", "P0002")
+        now = _now()
+        if p_touch:
+            chat["updated_at"] = now
+        message = {"id": str(uuid.uuid4()), "chat_id": p_chat_id, "content": p_content, "sender": p_sender, "created_at": now}
+        self.tables.setdefault("messages", []).append(message)
+        return dict(message)
+
+    def _rpc_touch_chats(self, p_chat_ids, p_updated_at):
+        updated_at = dict(zip(p_chat_ids, p_updated_at))
+        for chat in self.tables.get("chats", []):
+            if chat["id"] in updated_at:
+                chat["updated_at"] = max(chat["updated_at"], updated_at[chat["id"]])
+        return None
+
+    async def upload(self, bucket, path, content, content_type=None):
+        await self._round_trip()
+        self.objects[(bucket, path)] = bytes(content)
+        return {"Key": f"{bucket}/{path}"}
+
+    async def create_signed_url(self, bucket, path, expires_in):
+        await self._round_trip()
+        return f"memory://{bucket}/{path}?expires_in={expires_in}"
+
+    async def remove(self, bucket, paths):
+        await self._round_trip()
+        for path in paths:
+            self.objects.pop((bucket, path), None)
+        return [{"name": path} for path in paths]
+
+    async def _round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _project(row: dict, columns: str) -> dict:
+    if columns.strip() == "*":
+        return dict(row)
+    return {column.strip(): row.get(column.strip()) for column in columns.split(",")}
+
+
+def _matches_all(row: dict, filters) -> bool:
+    return all(_matches(row.get(column), op, value) for column, op, value in filters)
+
+
+def _sorts_after(row: dict, order, after) -> bool:
+    for (column, desc), value in zip(order, after):
+        actual, value = str(row.get(column)), str(value)
+        if actual != value:
+            return actual < value if desc else actual > value
+    return False
+
+
+def _matches(actual, op: str, expected) -> bool:
+    """
+    Evaluate one PostgREST-style filter; values compare as strings, which is
+    what the REST API sends and keeps ISO timestamps ordered.
+    """
+    if op.startswith("not."):
+        return not _matches(actual, op[4:], expected)
+    if op == "is":
+        return actual is None if str(expected) == "null" else actual is (str(expected) == "true")
+    if actual is None:
+        return False
+    if op == "in":
+        return str(actual) in {str(item) for item in expected}
+    actual, expected = str(actual), str(expected)
+    return {
+        "eq": actual == expected,
+        "neq": actual != expected,
+        "lt": actual < expected,
+        "lte": actual <= expected,
+        "gt": actual > expected,
+        "gte": actual >= expected,
+    }[op]
@@ -0,0 +1,198 @@
+"""
+Shared Model and Client Registry
+
+Heavy resources (the embedding model, the vector store and the Groq LLM)
+and the pooled Supabase client are created once per process, either lazily on first use or up front through
+`registry.warmup()` from the FastAPI startup hook. `/health` reports which
+resources are ready.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# After load_dotenv, so EMBED_SERVER_MODE from .env applies
+from services.embedding_server import EMBED_SERVER_MODE  # noqa: E402
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+# Local copy of the model (required by EMBEDDING_BACKEND=onnx); used instead of the hub name when set
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR") or None
+LLM_MODEL_NAME = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+
+# Loaded by warmup() and required for readiness; the Pinecone index is pulled in
+# by the vector store only when that backend is selected. With
+# EMBED_SERVER_MODE=process the model lives in the worker process, so this
+# process only loads the tokenizer (for the chunker).
+DEFAULT_WARMUP = (
+    ("embedding_server", "embedding_tokenizer", "vector_store", "llm")
+    if EMBED_SERVER_MODE == "process"
+    else ("embedding_model", "vector_store", "llm")
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+    def __init__(self):
+        self._loaders: Dict[str, Callable] = {}
+        self._instances: Dict[str, object] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._required = set()
+
+    def register(self, name: str, loader: Callable):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get(self, name: str):
+        """
+        Return the resource, loading it on first use. Concurrent callers wait
+        for a single load instead of loading their own copy.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                try:
+                    instance = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._instances[name] = instance
+                self._errors.pop(name, None)
+        return instance
+
+    def set(self, name: str, instance):
+        """
+        Replace a resource, e.g. with a fake in tests and benchmarks.
+        """
+        if name not in self._loaders:
+            self.register(name, lambda: instance)
+        self._instances[name] = instance
+
+    def require(self, names: Optional[Iterable[str]] = None):
+        """
+        Mark resources as needed before the process reports itself ready.
+        """
+        self._required.update(names or DEFAULT_WARMUP)
+
+    def warmup(self, names: Optional[Iterable[str]] = None):
+        """
+        Load resources ahead of the first request. Failures are recorded for
+        /health instead of raised.
+        """
+        names = list(names or DEFAULT_WARMUP)
+        self.require(names)
+        for name in names:
+            try:
+                self.get(name)
+                logger.info("Loaded %s", name)
+            except Exception:
+                logger.exception("Failed to load %s", name)
+
+    def ready(self) -> bool:
+        """
+        True once every resource requested through warmup() has loaded.
+        """
+        return all(name in self._instances for name in self._required)
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def status(self) -> Dict[str, str]:
+        status = {}
+        for name in self._loaders:
+            if name in self._instances:
+                status[name] = "ready"
+            elif name in self._errors:
+                status[name] = f"error: {self._errors[name]}"
+            else:
+                status[name] = "not_loaded"
+        return status
+
+
+def _load_embedding_model():
+    from clients.encoders import create_encoder
+    return create_encoder(EMBEDDING_MODEL_DIR or EMBEDDING_MODEL_NAME)
+
+
+def _load_embedding_tokenizer():
+    from clients.encoders import ModelTokenizer
+    return ModelTokenizer(EMBEDDING_MODEL_DIR or EMBEDDING_MODEL_NAME)
+
+
+def _load_embedding_server():
+    from services.embedding_server import create_embedding_server
+    return create_embedding_server(model_factory=_load_embedding_model)
+
+
+def _load_pinecone_index():
+    from clients.pinecone_client import create_pinecone_index
+    return create_pinecone_index()
+
+
+def _load_vector_store():
+    from services.vector_store import create_vector_store
+    return create_vector_store()
+
+
+def _load_supabase():
+    from clients.supabase_client import create_supabase
+    return create_supabase()
+
+
+def _load_llm():
+    from llama_index.llms.groq import Groq
+    return Groq(api_key=os.getenv("GROQ_API_KEY"), model=LLM_MODEL_NAME)
+
+
+registry = Registry()
+registry.register("embedding_model", _load_embedding_model)
+registry.register("embedding_tokenizer", _load_embedding_tokenizer)
+registry.register("embedding_server", _load_embedding_server)
+registry.register("pinecone_index", _load_pinecone_index)
+registry.register("vector_store", _load_vector_store)
+registry.register("llm", _load_llm)
+registry.register("supabase", _load_supabase)
+
+
+def get_embedding_model():
+    return registry.get("embedding_model")
+
+
+def get_embedding_tokenizer():
+    """
+    Something with the model's `tokenizer` and `max_seq_length`, for the
+    chunker: the model itself when it is loaded in this process, otherwise
+    the tokenizer alone.
+    """
+    if EMBED_SERVER_MODE == "process" and not registry.loaded("embedding_model"):
+        return registry.get("embedding_tokenizer")
+    return get_embedding_model()
+
+
+def get_embedding_server():
+    return registry.get("embedding_server")
+
+
+def get_pinecone_index():
+    return registry.get("pinecone_index")
+
+
+def get_vector_store():
+    return registry.get("vector_store")
+
+
+def get_llm():
+    return registry.get("llm")
+
+
+def get_supabase():
+    return registry.get("supabase")
@@ -1,5 +1,16 @@
-from supabase import create_client
+"""
+Async Supabase Client
+
+Talks to Supabase's REST (PostgREST) and Storage APIs over one pooled
+httpx.AsyncClient with keep-alive, so database calls no longer block the
+event loop and concurrent requests share warm connections.
+"""
+
 import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
 from dotenv import load_dotenv
 
 
@@ -9,4 +20,165 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+# (column, operator, value), e.g. ("user_id", "eq", "u1"), ("pages_count", "not.is", "null")
+# or ("file_id", "in", ["a", "b"])
+Filter = Tuple[str, str, object]
+# (column, descending)
+Order = Tuple[str, bool]
+
+
+class DatabaseError(Exception):
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class AsyncSupabase:
+    def __init__(self, url: str = SUPABASE_URL, key: str = SUPABASE_KEY, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = (url or "").rstrip("/")
+        self._client = httpx.AsyncClient(
+            headers={"apikey": key or "", "Authorization": f"Bearer {key}"},
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=SUPABASE_TIMEOUT,
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    # ---- Database (PostgREST) ----
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Iterable[Filter] = (),
+        order: Sequence[Order] = (),
+        limit: Optional[int] = None,
+        count: bool = False,
+        after: Optional[Sequence] = None,
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        Returns (rows, total_count); total_count is only set when `count` is true.
+        `after` holds one value per `order` column and keeps only the rows that
+        sort strictly after that position (keyset pagination).
+        """
+        params = [("select", "".join(columns.split())), *_filter_params(filters)]
+        if after is not None:
+            params.append(("or", _keyset_filter(order, after)))
+        if order:
+            params.append(("order", ",".join(f"{column}.{'desc' if desc else 'asc'}" for column, desc in order)))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+        headers = {"Prefer": "count=exact"} if count else {}
+
+        response = await self._client.get(self._rest(table), params=params, headers=headers)
+        rows = self._json(response)
+        total = None
+        if count:
+            content_range = response.headers.get("content-range", "")
+            total = int(content_range.split("/")[-1]) if "/" in content_range and content_range.split("/")[-1] != "*" else len(rows)
+        return rows, total
+
+    async def insert(self, table: str, rows) -> List[dict]:
+        response = await self._client.post(self._rest(table), json=rows, headers={"Prefer": "return=representation"})
+        return self._json(response)
+
+    async def update(self, table: str, values: dict, filters: Iterable[Filter]) -> List[dict]:
+        response = await self._client.patch(
+            self._rest(table), params=_filter_params(filters), json=values, headers={"Prefer": "return=representation"}
+        )
+        return self._json(response)
+
+    async def delete(self, table: str, filters: Iterable[Filter]) -> List[dict]:
+        response = await self._client.delete(self._rest(table), params=_filter_params(filters), headers={"Prefer": "return=representation"})
+        return self._json(response)
+
+    async def rpc(self, function: str, params: dict):
+        response = await self._client.post(self._rest(f"rpc/{function}"), json=params)
+        return self._json(response)
+
+    # ---- Storage ----
+
+    async def upload(self, bucket: str, path: str, content: bytes, content_type: Optional[str] = None):
+        response = await self._client.post(
+            self._storage(f"object/{bucket}/{quote(path)}"),
+            content=content,
+            headers={"Content-Type": content_type or "application/octet-stream"},
+        )
+        return self._json(response)
+
+    async def create_signed_url(self, bucket: str, path: str, expires_in: int) -> str:
+        response = await self._client.post(self._storage(f"object/sign/{bucket}/{quote(path)}"), json={"expiresIn": expires_in})
+        signed = self._json(response)
+        return f"{self.url}/storage/v1{signed['signedURL']}"
+
+    async def remove(self, bucket: str, paths: List[str]):
+        response = await self._client.request("DELETE", self._storage(f"object/{bucket}"), json={"prefixes": paths})
+        return self._json(response)
+
+    def _rest(self, path: str) -> str:
+        return f"{self.url}/rest/v1/{path}"
+
+    def _storage(self, path: str) -> str:
+        return f"{self.url}/storage/v1/{path}"
+
+    @staticmethod
+    def _json(response: httpx.Response):
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+                message = body.get("message") or body.get("error") or response.text
+                code = body.get("code")
+            except ValueError:
+                message, code = response.text, None
+            raise DatabaseError(response.status_code, message, code)
+        if not response.content:
+            return []
+        return response.json()
+
+
+def _filter_params(filters: Iterable[Filter]) -> List[Tuple[str, str]]:
+    return [(column, f"{op}.{_filter_value(op, value)}") for column, op, value in filters]
+
+
+def _filter_value(op: str, value) -> str:
+    # PostgREST takes a plain operand verbatim up to the end of the parameter,
+    # so commas, dots and parentheses in it are data (httpx percent-encodes the
+    # rest). An `in` list is parsed, so each of its elements is double-quoted.
+    if op.rsplit(".", 1)[-1] == "in":
+        return f"({','.join(_quote(item) for item in value)})"
+    return str(value)
+
+
+def _keyset_filter(order: Sequence[Order], after: Sequence) -> str:
+    # (a, b) after (x, y) in "a desc, b desc" order: a < x or (a = x and b < y)
+    clauses = []
+    for i, (column, desc) in enumerate(order):
+        terms = [f"{c}.eq.{_quote(v)}" for (c, _), v in zip(order[:i], after[:i])]
+        terms.append(f"{column}.{'lt' if desc else 'gt'}.{_quote(after[i])}")
+        clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return f"({','.join(clauses)})"
+
+
+def _quote(value) -> str:
+    # Values inside or=(...) and in.(...) are double-quoted so commas, colons,
+    # dots and parentheses (e.g. in timestamps) aren't read as syntax
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def create_supabase() -> AsyncSupabase:
+    """
+    Build the pooled client. Called once per process through the registry.
+    """
+    return AsyncSupabase(SUPABASE_URL, SUPABASE_KEY)
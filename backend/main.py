@@ -1,13 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from routes.pdf_routes import router as pdf_router
 from routes.ask_question import router as question_router
 from routes.chat_routes import router as chat_router
+from routes.job_routes import router as job_router
+from services.jobs import job_manager
+from clients.registry import registry, get_embedding_server, get_supabase
+from services.llama_query import query_embedding_cache
+from services.answer_cache import answer_cache
+from services.query_router import route_latency
+from services.write_behind import chat_touch_buffer
+from services.metrics import metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.telemetry import configure_logging, RequestContextMiddleware, REQUEST_ID_HEADER
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 app = FastAPI()
 
@@ -19,19 +30,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+# Assign request ids and record HTTP metrics; outermost so it sees every response
+app.add_middleware(RequestContextMiddleware)
+
 # Root endpoint for health check
 @app.get("/")
 async def root():
     return {"message": "PDF LLM API is running", "status": "healthy"}
 
-# Health check endpoint
+# Health check endpoint, including readiness of the shared models and clients
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    ready = registry.ready()
+    return {
+        "status": "healthy" if ready else "starting",
+        "ready": ready,
+        "resources": registry.status(),
+        "caches": {
+            "query_embedding": query_embedding_cache.stats(),
+            "answers": answer_cache.stats()
+        },
+        "routes": route_latency.summary(),
+        "chat_touch_buffer": chat_touch_buffer.stats(),
+        "embedding_server": get_embedding_server().stats() if registry.loaded("embedding_server") else None
+    }
+
+# Prometheus scrape endpoint: stage timings, HTTP and ingestion counters
+@app.get("/metrics")
+async def metrics():
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Optionally load the models and clients in the background at startup
+# instead of on the first request that needs them
+@app.on_event("startup")
+async def warmup_registry():
+    if os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes"):
+        registry.require()
+        asyncio.get_running_loop().run_in_executor(None, registry.warmup)
+
+# Stop accepting ingestion work when the server shuts down
+@app.on_event("shutdown")
+async def shutdown_jobs():
+    job_manager.shutdown()
+
+# Stop the embedding server's batching thread (and worker process, if any)
+@app.on_event("shutdown")
+async def close_embedding_server():
+    if registry.loaded("embedding_server"):
+        get_embedding_server().close()
+
+# Flush coalesced chat timestamps periodically when write-behind is enabled
+@app.on_event("startup")
+async def start_chat_touch_buffer():
+    chat_touch_buffer.start()
+
+# Flush pending chat timestamps, then close the pooled database connections
+@app.on_event("shutdown")
+async def close_supabase():
+    await chat_touch_buffer.stop()
+    if registry.loaded("supabase"):
+        await get_supabase().aclose()
 
 # Include routers
 app.include_router(pdf_router)
 app.include_router(question_router)
 app.include_router(chat_router)
+app.include_router(job_router)
@@ -1,40 +1,77 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from services.llama_query import ask_question_stream
+from typing import List, Optional
+from services.llama_query import ask_question_stream, ask_questions_batch, MAX_QUERY_FILES
+from services.sse import SSE_GZIP, accepts_gzip, answer_events, gzip_frames
 import json
+import os
 
 router = APIRouter()
 
+# Upper bound on questions per batch request
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "100"))
+
 class QuestionRequest(BaseModel):
-    file_id: str
+    file_id: Optional[str] = None
+    file_ids: Optional[List[str]] = None  # Answer across several documents
     question: str
 
+class BatchQuestionRequest(BaseModel):
+    file_id: str
+    questions: List[str]
+
 @router.post("/ask-question")
-async def ask_q(payload: QuestionRequest):
+async def ask_q(payload: QuestionRequest, request: Request):
     """
-    Ask a question about a specific PDF file using AI with streaming response
+    Ask a question about a specific PDF file, or across several with
+    `file_ids`, using AI with streaming response
     """
-    if not payload.file_id or not payload.question:
-        raise HTTPException(status_code=400, detail="file_id and question are required")
-    
-    async def generate_stream():
-        try:
-            async for chunk in ask_question_stream(payload.file_id, payload.question):
-                # Format as Server-Sent Events
-                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-        finally:
-            yield f"data: {json.dumps({'done': True})}\n\n"
-    
+    file_ids = payload.file_ids or ([payload.file_id] if payload.file_id else [])
+    if not file_ids or not payload.question:
+        raise HTTPException(status_code=400, detail="file_id (or file_ids) and question are required")
+    if len(file_ids) > MAX_QUERY_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QUERY_FILES} file_ids per question")
+
+    # Coalesced SSE events; gzip only if enabled and the client accepts it
+    compress = SSE_GZIP and accepts_gzip(request.headers.get("accept-encoding"))
+    frames = answer_events(ask_question_stream(file_ids, payload.question))
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": "*",
+    }
+    if SSE_GZIP:
+        headers["Vary"] = "Accept-Encoding"
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        gzip_frames(frames) if compress else frames,
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+@router.post("/ask-question/batch")
+async def ask_batch(payload: BatchQuestionRequest):
+    """
+    Answer several questions about one PDF file. Results stream back as
+    NDJSON, one line per question in completion order; `index` points back
+    into the request's `questions`.
+    """
+    if not payload.file_id or not payload.questions or not all(q.strip() for q in payload.questions):
+        raise HTTPException(status_code=400, detail="file_id and non-empty questions are required")
+    if len(payload.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    async def generate_lines():
+        async for result in ask_questions_batch(payload.file_id, payload.questions):
+            yield json.dumps(result) + "\n"
+
     return StreamingResponse(
-        generate_stream(),
-        media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-        }
+        generate_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
     )
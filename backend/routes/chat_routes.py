@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from clients.supabase_client import supabase
+from services.repositories import chat_repository, message_repository, NotFoundError
+from services.write_behind import chat_touch_buffer
+from services.pagination import InvalidCursor, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "50"))
+MESSAGE_PAGE_SIZE = int(os.getenv("MESSAGE_PAGE_SIZE", "100"))
+
 class CreateChatRequest(BaseModel):
     title: str
     pdf_document_id: str
@@ -26,16 +33,32 @@ class ChatResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class ChatSummaryResponse(BaseModel):
+    # Just what the chat list renders
+    id: str
+    title: str
+    created_at: datetime
+    updated_at: datetime
+
+class ChatPageResponse(BaseModel):
+    chats: List[ChatSummaryResponse]
+    next_cursor: Optional[str] = None
+
 class MessageResponse(BaseModel):
     id: str
-    chat_id: str
+    chat_id: Optional[str] = None  # Omitted in history pages, where it is implied
     content: str
     sender: str
     created_at: datetime
 
+class MessagePageResponse(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Fetches older messages
+
 class ChatWithMessagesResponse(BaseModel):
     chat: ChatResponse
     messages: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Fetches older messages
 
 @router.post("/create", response_model=ChatResponse)
 async def create_chat(request: CreateChatRequest):
@@ -50,15 +73,7 @@ async def create_chat(request: CreateChatRequest):
             "user_id": request.user_id
         }
         
-        response = supabase.table("chats").insert(chat_data).execute()
-        
-        if hasattr(response, 'error') and response.error:
-            raise HTTPException(status_code=500, detail=f"Failed to create chat: {response.error}")
-        
-        if not response.data or len(response.data) == 0:
-            raise HTTPException(status_code=500, detail="No data returned from chat creation")
-        
-        chat = response.data[0]
+        chat = await chat_repository.create(chat_data)
         return ChatResponse(**chat)
         
     except HTTPException:
@@ -76,30 +91,21 @@ async def send_message(request: SendMessageRequest):
         if request.sender not in ['user', 'assistant']:
             raise HTTPException(status_code=400, detail="Sender must be 'user' or 'assistant'")
         
-        # Check if chat exists
-        chat_response = supabase.table("chats").select("id").eq("id", request.chat_id).execute()
-        if not chat_response.data:
+        # ✅ One round trip: validate the chat, insert and bump updated_at together.
+        # With the write-behind buffer on, the bump is coalesced and flushed later.
+        try:
+            message = await message_repository.append(
+                request.chat_id,
+                request.content,
+                request.sender,
+                touch=not chat_touch_buffer.enabled
+            )
+        except NotFoundError:
             raise HTTPException(status_code=404, detail="Chat not found")
         
-        # Insert message
-        message_data = {
-            "chat_id": request.chat_id,
-            "content": request.content,
-            "sender": request.sender
-        }
-        
-        response = supabase.table("messages").insert(message_data).execute()
-        
-        if hasattr(response, 'error') and response.error:
-            raise HTTPException(status_code=500, detail=f"Failed to send message: {response.error}")
+        if chat_touch_buffer.enabled:
+            chat_touch_buffer.touch(request.chat_id, message["created_at"])
         
-        if not response.data or len(response.data) == 0:
-            raise HTTPException(status_code=500, detail="No data returned from message creation")
-        
-        # Update chat's updated_at timestamp
-        supabase.table("chats").update({"updated_at": datetime.now().isoformat()}).eq("id", request.chat_id).execute()
-        
-        message = response.data[0]
         return MessageResponse(**message)
         
     except HTTPException:
@@ -107,56 +113,63 @@ async def send_message(request: SendMessageRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/all", response_model=List[ChatResponse])
-async def get_all_chats():
+@router.get("/all", response_model=ChatPageResponse)
+async def get_all_chats(
+    limit: int = Query(CHAT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
-    Get all chats (for when user_id is empty)
+    Get all chats (for when user_id is empty), one page at a time
     """
     try:
-        response = supabase.table("chats").select("*").order("updated_at", desc=True).execute()
-        
-        chats = response.data if response.data else []
-        return [ChatResponse(**chat) for chat in chats]
+        chats, next_cursor = await chat_repository.list_page(limit, cursor)
+        return ChatPageResponse(chats=[ChatSummaryResponse(**chat) for chat in chats], next_cursor=next_cursor)
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/user/{user_id}/chats", response_model=List[ChatResponse])
-async def get_user_chats(user_id: str):
+@router.get("/user/{user_id}/chats", response_model=ChatPageResponse)
+async def get_user_chats(
+    user_id: str,
+    limit: int = Query(CHAT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
-    Get all chats for a specific user
+    Get the chats of a specific user, most recently active first, one page at a time
     """
     try:
-        response = supabase.table("chats").select("*").eq("user_id", user_id).order("updated_at", desc=True).execute()
-        
-        chats = response.data if response.data else []
-        return [ChatResponse(**chat) for chat in chats]
+        chats, next_cursor = await chat_repository.list_page(limit, cursor, user_id=user_id)
+        return ChatPageResponse(chats=[ChatSummaryResponse(**chat) for chat in chats], next_cursor=next_cursor)
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{chat_id}", response_model=ChatWithMessagesResponse)
-async def get_chat_with_messages(chat_id: str):
+async def get_chat_with_messages(
+    chat_id: str,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     """
-    Fetch a chat with all its messages
+    Fetch a chat with its most recent messages; older ones via /chat/{chat_id}/messages
     """
     try:
-        # Get chat details
-        chat_response = supabase.table("chats").select("*").eq("id", chat_id).execute()
+        # Chat details and its messages in parallel, over separate pooled connections
+        chat, (messages, next_cursor) = await asyncio.gather(
+            chat_repository.get(chat_id),
+            message_repository.list_page(chat_id, limit)
+        )
         
-        if not chat_response.data:
+        if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
         
-        chat = chat_response.data[0]
-        
-        # Get messages for this chat
-        messages_response = supabase.table("messages").select("*").eq("chat_id", chat_id).order("created_at", desc=False).execute()
-        
-        messages = messages_response.data if messages_response.data else []
-        
         return ChatWithMessagesResponse(
             chat=ChatResponse(**chat),
-            messages=[MessageResponse(**msg) for msg in messages]
+            messages=[MessageResponse(**msg) for msg in messages],
+            next_cursor=next_cursor
         )
         
     except HTTPException:
@@ -164,6 +177,24 @@ async def get_chat_with_messages(chat_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{chat_id}/messages", response_model=MessagePageResponse)
+async def get_chat_messages(
+    chat_id: str,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Page backwards through a chat's history; pass the previous response's next_cursor
+    """
+    try:
+        messages, next_cursor = await message_repository.list_page(chat_id, limit, cursor)
+        return MessagePageResponse(messages=[MessageResponse(**msg) for msg in messages], next_cursor=next_cursor)
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.delete("/{chat_id}")
 async def delete_chat(chat_id: str):
     """
@@ -171,10 +202,7 @@ async def delete_chat(chat_id: str):
     """
     try:
         # Delete chat (messages will be deleted automatically due to CASCADE)
-        response = supabase.table("chats").delete().eq("id", chat_id).execute()
-        
-        if hasattr(response, 'error') and response.error:
-            raise HTTPException(status_code=500, detail=f"Failed to delete chat: {response.error}")
+        await chat_repository.delete(chat_id)
         
         return {"message": "Chat deleted successfully"}
         
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from services.jobs import job_manager, FINISHED_STATUSES
+import json
+import os
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# Seconds between keep-alive comments on an idle event stream
+JOB_EVENTS_HEARTBEAT = float(os.getenv("JOB_EVENTS_HEARTBEAT", "15"))
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status of a background PDF ingestion job
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Follow an ingestion job as server-sent events: one `data:` message with
+    the job record on every status or progress change, ending after done/failed
+    """
+    watcher = job_manager.watch(job_id)
+    if watcher is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def generate_events():
+        try:
+            while True:
+                job = await watcher.next(timeout=JOB_EVENTS_HEARTBEAT)
+                if job is None:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(job)}\n\n"
+                if job["status"] in FINISHED_STATUSES:
+                    return
+        finally:
+            job_manager.unwatch(job_id, watcher)
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
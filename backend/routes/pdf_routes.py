@@ -18,3 +18,18 @@ async def upload_pdf(
     Upload a PDF file to Supabase storage
     """
     return await pdf_service.upload_pdf(file, user_id)
+
+@router.post("/pdf-reprocess/{file_id}")
+async def reprocess_pdf(file_id: str, restart: bool = False):
+    """
+    Re-run ingestion for a PDF that is already stored in Supabase storage.
+    Resumes a failed ingestion from its last checkpoint unless `restart=true`
+    """
+    return await pdf_service.reprocess_pdf(file_id, restart)
+
+@router.delete("/documents/{document_id}")
+async def delete_document(document_id: str):
+    """
+    Delete a document; its vectors and stored file go with the last reference
+    """
+    return await pdf_service.delete_document(document_id)
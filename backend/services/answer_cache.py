@@ -0,0 +1,119 @@
+"""
+Semantic Answer Cache
+
+Keeps previous answers per file_id together with the embedding of the
+question that produced them. A new question whose embedding is within a
+cosine-similarity threshold of a cached one gets the cached answer, found
+with a single vectorized scan over that file's question matrix.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_ENTRIES_PER_FILE = int(os.getenv("SEMANTIC_CACHE_ENTRIES_PER_FILE", "256"))
+SEMANTIC_CACHE_MAX_FILES = int(os.getenv("SEMANTIC_CACHE_MAX_FILES", "1024"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+
+
+class _FileAnswers:
+    """
+    Fixed-capacity ring buffer of (question vector, answer) pairs for one file.
+    """
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.stored_at = np.full(capacity, -np.inf)
+        self.answers = [None] * capacity
+        self.next_slot = 0
+
+    def add(self, vector: np.ndarray, answer: str, now: float):
+        slot = self.next_slot
+        self.vectors[slot] = vector
+        self.stored_at[slot] = now
+        self.answers[slot] = answer
+        self.next_slot = (slot + 1) % len(self.answers)
+
+    def best_match(self, vector: np.ndarray, oldest_allowed: float):
+        similarities = self.vectors @ vector
+        # Empty and expired slots never match
+        similarities[self.stored_at < oldest_allowed] = -np.inf
+        slot = int(np.argmax(similarities))
+        return similarities[slot], self.answers[slot]
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        entries_per_file: int = SEMANTIC_CACHE_ENTRIES_PER_FILE,
+        max_files: int = SEMANTIC_CACHE_MAX_FILES,
+        ttl: float = SEMANTIC_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.entries_per_file = entries_per_file
+        self.max_files = max_files
+        self.ttl = ttl
+        self._files = OrderedDict()  # file_id -> _FileAnswers, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, file_id: str, vector: np.ndarray) -> Optional[str]:
+        vector = _normalize(vector)
+        with self._lock:
+            answers = self._files.get(file_id)
+            if answers is not None and answers.vectors.shape[1] == vector.shape[0]:
+                similarity, answer = answers.best_match(vector, time.monotonic() - self.ttl)
+                if similarity >= self.threshold:
+                    self._files.move_to_end(file_id)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+            return None
+
+    def store(self, file_id: str, vector: np.ndarray, answer: str):
+        vector = _normalize(vector)
+        with self._lock:
+            answers = self._files.get(file_id)
+            if answers is None or answers.vectors.shape[1] != vector.shape[0]:
+                answers = _FileAnswers(self.entries_per_file, vector.shape[0])
+                self._files[file_id] = answers
+            answers.add(vector, answer, time.monotonic())
+            self._files.move_to_end(file_id)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+    def invalidate(self, file_id: str):
+        """
+        Forget every cached answer for a file, e.g. after it was re-ingested.
+        """
+        with self._lock:
+            if self._files.pop(file_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._files),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,61 @@
+"""
+Ingestion Checkpoints
+
+Ingestion commits a document in page-range segments. After every segment's
+vectors are confirmed by the vector store, a checkpoint records how many
+leading pages are done, so a failed ingestion that is retried (through
+POST /pdf-reprocess/{file_id}) resumes at the next segment instead of
+starting over. The checkpoint is removed once the document is fully ingested.
+
+Checkpoints are small JSON files, one per file_id, under
+INGEST_CHECKPOINT_DIR; each write replaces the file atomically.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+INGEST_CHECKPOINT_DIR = os.getenv(
+    "INGEST_CHECKPOINT_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "ingest_checkpoints")
+)
+
+
+class CheckpointStore:
+    def __init__(self, root: str = INGEST_CHECKPOINT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def load(self, file_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(file_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # An unreadable checkpoint only costs a full re-ingestion
+            return None
+
+    def save(self, file_id: str, checkpoint: dict):
+        path = self._path(file_id)
+        data = {**checkpoint, "file_id": file_id, "updated_at": time.time()}
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+    def delete(self, file_id: str):
+        try:
+            os.remove(self._path(file_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.root, (re.sub(r"[^A-Za-z0-9_.-]", "_", file_id) or "_default") + ".json")
+
+
+checkpoint_store = CheckpointStore()
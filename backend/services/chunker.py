@@ -0,0 +1,203 @@
+"""
+Token-Aware Chunker
+
+Sizes chunks by the embedding model's own tokenizer, so no chunk is longer
+than the model's max sequence length and nothing is silently truncated.
+
+Each page is tokenized once, with character offsets. A chunk is a
+[char_start, char_end) slice of the page text: the chunk text is one slice,
+and the offsets go into the vector metadata. Windows end at a sentence
+boundary when there is one in the back half of the window, and the overlap
+starts at a sentence boundary when it can.
+
+With CHUNK_CROSS_PAGE=true, the first chunk of a page is prefixed with the
+tail of the previous page, so passages split by a page break stay retrievable.
+"""
+
+import bisect
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from services.metrics import span
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "384"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+CHUNK_CROSS_PAGE = os.getenv("CHUNK_CROSS_PAGE", "false").lower() in ("1", "true", "yes")
+
+# [CLS] and [SEP] are added by the encoder on top of the chunk's own tokens
+SPECIAL_TOKENS = 2
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) before
+# whitespace, or a blank line
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+Offsets = List[Tuple[int, int]]
+
+
+class RegexTokenizer:
+    """
+    Fallback when the model has no fast tokenizer (e.g. FakeEncoder): words and
+    punctuation marks count as one token each, which slightly overestimates
+    WordPiece counts for plain English.
+    """
+
+    def offsets(self, text: str) -> Offsets:
+        return [match.span() for match in _WORD.finditer(text)]
+
+
+class HFTokenizer:
+    """
+    Wraps a Hugging Face fast tokenizer (SentenceTransformer.tokenizer).
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def offsets(self, text: str) -> Offsets:
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return [tuple(span) for span in encoding["offset_mapping"]]
+
+
+@dataclass
+class Chunk:
+    page: int
+    chunk_index: int
+    char_start: int
+    char_end: int
+    token_count: int
+    carry_page: Optional[int] = None
+    carry_char_start: Optional[int] = None
+
+    def metadata(self, text: str) -> dict:
+        meta = {
+            "page": self.page,
+            "chunk_index": self.chunk_index,
+            "text": text,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+            "token_count": self.token_count,
+        }
+        if self.carry_page is not None:
+            meta["carry_page"] = self.carry_page
+            meta["carry_char_start"] = self.carry_char_start
+        return meta
+
+
+class Chunker:
+    def __init__(
+        self,
+        tokenizer=None,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap: int = CHUNK_OVERLAP_TOKENS,
+        cross_page: bool = CHUNK_CROSS_PAGE,
+        max_seq_length: Optional[int] = None,
+    ):
+        self.tokenizer = tokenizer or RegexTokenizer()
+        if max_seq_length:
+            max_tokens = min(max_tokens, max_seq_length - SPECIAL_TOKENS)
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.overlap = max(0, min(overlap, max_tokens // 2))
+        self.cross_page = cross_page
+
+    @classmethod
+    def for_model(cls, model, **kwargs) -> "Chunker":
+        """
+        Chunker matched to an encoder: its fast tokenizer if it has one, and a
+        budget that fits its max_seq_length.
+        """
+        tokenizer = getattr(model, "tokenizer", None)
+        wrapped = HFTokenizer(tokenizer) if getattr(tokenizer, "is_fast", False) else None
+        return cls(tokenizer=wrapped, max_seq_length=getattr(model, "max_seq_length", None), **kwargs)
+
+    def chunk_page(self, page: int, text: str, carry_tokens: int = 0) -> Tuple[List[Chunk], Offsets]:
+        """
+        Chunks of one page; the first chunk leaves room for `carry_tokens` of
+        context from the previous page. Also returns the page's token offsets.
+        """
+        offsets = self.tokenizer.offsets(text)
+        n = len(offsets)
+        starts = [start for start, _ in offsets]
+        # Token indices at which a new sentence begins
+        boundaries = sorted({bisect.bisect_left(starts, m.end()) for m in _SENTENCE_END.finditer(text)})
+
+        chunks = []
+        first = 0
+        while first < n:
+            budget = self.max_tokens - (carry_tokens if not chunks else 0)
+            last = min(first + budget, n)
+            if last < n:
+                # Prefer ending on a sentence boundary in the back half of the window
+                i = bisect.bisect_right(boundaries, last) - 1
+                if i >= 0 and boundaries[i] > first + budget // 2:
+                    last = boundaries[i]
+                last = _word_end(offsets, first, last)
+            chunks.append(Chunk(page, len(chunks), offsets[first][0], offsets[last - 1][1], last - first))
+            if last == n:
+                break
+
+            next_first = max(last - self.overlap, first + 1)
+            # Start the overlap on a sentence boundary if one falls inside it
+            i = bisect.bisect_left(boundaries, next_first)
+            if i < len(boundaries) and boundaries[i] < last:
+                next_first = boundaries[i]
+            first = _word_start(offsets, next_first, lowest=first + 1)
+        return chunks, offsets
+
+    def iter_chunks(self, pages: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+        """
+        Yields (text, metadata) for every chunk of every page, in order.
+        """
+        previous = None  # (page, text, offsets) of the last non-empty page
+        for page in pages:
+            text = page["text"]
+            carry = self._carry(previous) if self.cross_page else None
+            with span("chunking", page=page["page"]):
+                chunks, offsets = self.chunk_page(page["page"], text, carry_tokens=carry[2] if carry else 0)
+            for chunk in chunks:
+                chunk_text = text[chunk.char_start:chunk.char_end]
+                if carry and chunk.chunk_index == 0:
+                    carry_page, carry_start, carry_count, carry_text = carry
+                    chunk.carry_page, chunk.carry_char_start = carry_page, carry_start
+                    chunk.token_count += carry_count
+                    chunk_text = f"{carry_text}\n{chunk_text}"
+                yield chunk_text, chunk.metadata(chunk_text)
+            if offsets:
+                previous = (page["page"], text, offsets)
+
+    def _carry(self, previous) -> Optional[Tuple[int, int, int, str]]:
+        # The previous page's last `overlap` tokens: (page, char_start, token_count, text)
+        if previous is None or not self.overlap:
+            return None
+        page, text, offsets = previous
+        n = len(offsets)
+        first = _word_start(offsets, max(n - self.overlap, 0), lowest=max(n - self.max_tokens // 2, 0))
+        start = offsets[first][0]
+        return page, start, n - first, text[start:offsets[-1][1]]
+
+
+def _joined(offsets: Offsets, i: int) -> bool:
+    # Token i continues token i - 1 with no gap, e.g. a "##ing" subword or a trailing "."
+    return offsets[i][0] == offsets[i - 1][1]
+
+
+def _word_end(offsets: Offsets, first: int, last: int) -> int:
+    """
+    Pull `last` back so the slice doesn't stop inside a word, which would
+    re-tokenize differently on its own.
+    """
+    end = last
+    while end > first + 1 and end < len(offsets) and _joined(offsets, end):
+        end -= 1
+    return end if end > first + 1 else last
+
+
+def _word_start(offsets: Offsets, first: int, lowest: int) -> int:
+    start = first
+    while start > lowest and _joined(offsets, start):
+        start -= 1
+    return start if start == 0 or not _joined(offsets, start) else first
@@ -1,19 +1,31 @@
 import requests
 import os
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+DOWNLOAD_TIMEOUT = 60  # seconds
+
+
 def download_pdf_from_url(signed_url: str, local_path: str) -> str:
     """
     Downloads the PDF from a signed Supabase URL and saves it locally.
+    The body is streamed to disk in chunks instead of being buffered in memory.
     Returns the saved file path.
     """
     # Ensure the directory exists
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
     
-    response = requests.get(signed_url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to download PDF: {response.status_code}")
-    
-    with open(local_path, "wb") as f:
-        f.write(response.content)
+    with requests.get(signed_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise Exception(f"Failed to download PDF: {response.status_code}")
+
+        try:
+            with open(local_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        except Exception:
+            # Don't leave a truncated file behind
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            raise
     
     return local_path
@@ -1,82 +1,183 @@
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-import uuid
-from typing import List
+import bisect
+import logging
+import numpy as np
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
+from clients.registry import get_embedding_server, get_embedding_tokenizer, get_vector_store
+from services.chunker import Chunker
+from services.embedding_server import INGEST
+from services.metrics import metrics_registry, span, timed_iter
+from services.pipeline import background
+from services.telemetry import log_fields
+from services.vector_writer import BulkUpserter, vector_id
 
 # Load environment variables
 load_dotenv()
 
-# ✅ Load embedding model (you can load this once)
-model = SentenceTransformer("BAAI/bge-small-en-v1.5")
+# Number of chunks encoded per forward pass, across page boundaries
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Pages per committed segment; a retried ingestion resumes at a segment boundary
+INGEST_SEGMENT_PAGES = int(os.getenv("INGEST_SEGMENT_PAGES", "50"))
 
-# ✅ Initialize Pinecone with new API
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+logger = logging.getLogger(__name__)
 
+pages_ingested = metrics_registry.counter("ingest_pages_total", "PDF pages extracted and chunked.")
+chunks_embedded = metrics_registry.counter("ingest_chunks_total", "Chunks encoded and handed to the vector writer.")
 
-def chunk_text(text: str, max_length=300, overlap=50) -> List[str]:
+
+def _count_pages(pages: Iterable[dict], stats: dict, skip_through: int = 0) -> Iterator[dict]:
+    for page in pages:
+        if page["page"] > skip_through:
+            stats["pages"] += 1
+            # In page order, so a checkpoint can count the pages it covers
+            stats["page_numbers"].append(page["page"])
+            pages_ingested.inc()
+        yield page
+
+
+def iter_chunk_batches(
+    pages: Iterable[dict],
+    batch_size: int,
+    stats: Optional[dict] = None,
+    chunker: Optional[Chunker] = None,
+    skip_through: int = 0,
+) -> Iterator[Tuple[List[str], List[dict]]]:
+    """
+    Chunks pages and groups the chunks into fixed-size encode batches that span
+    page boundaries. Yields (texts, metadata) pairs; the last batch may be short.
+    Chunks of pages up to `skip_through` are dropped: those pages are only
+    passed in so a cross-page chunk can carry their tail.
+    """
+    chunker = chunker or Chunker.for_model(get_embedding_tokenizer())
+    # Time spent waiting on the extractor for each page
+    pages = timed_iter(pages, "extraction")
+    if stats is not None:
+        pages = _count_pages(pages, stats, skip_through)
+    texts, metas = [], []
+    for text, meta in chunker.iter_chunks(pages):
+        if meta["page"] <= skip_through:
+            continue
+        texts.append(text)
+        metas.append(meta)
+        if len(texts) == batch_size:
+            yield texts, metas
+            texts, metas = [], []
+    if texts:
+        yield texts, metas
+
+
+def encode_batches(batches: Iterable[Tuple[List[str], List[dict]]], batch_size: int) -> Iterator[Tuple[np.ndarray, List[dict]]]:
     """
-    Splits long text into overlapping chunks for better embedding context.
+    Encodes each batch through the embedding server at ingestion priority, so
+    questions asked meanwhile are not stuck behind a whole document. Embeddings
+    stay one contiguous float32 array per batch.
     """
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        end = min(start + max_length, len(words))
-        chunks.append(" ".join(words[start:end]))
-        start += max_length - overlap
-    return chunks
+    server = get_embedding_server()
+    for texts, metas in batches:
+        with span("encoding", batch=len(texts)):
+            embeddings = server.encode(texts, INGEST)
+        chunks_embedded.inc(len(texts))
+        yield np.ascontiguousarray(embeddings, dtype=np.float32), metas
 
 
-def embed_and_store(pages: List[dict], file_id: str):
+def embed_and_store(
+    pages: Iterable[dict],
+    file_id: str,
+    on_status: Optional[Callable[[str], None]] = None,
+    batch_size: Optional[int] = None,
+    resume: Optional[dict] = None,
+    on_commit: Optional[Callable[[dict], None]] = None,
+    on_progress: Optional[Callable[..., None]] = None,
+    segment_pages: Optional[int] = None,
+):
     """
-    Chunk text, generate embeddings, and store in Pinecone.
+    Chunk text, generate embeddings, and store them in the vector store.
+    Runs as a three-stage pipeline: chunking (pulling pages from the extractor),
+    batched encoding and upserting each overlap on their own thread. Upserts go
+    through a BulkUpserter with deterministic ids, so a retried ingestion
+    overwrites its earlier vectors.
+
+    Pages are committed in segments of `segment_pages`: when the first chunk
+    past a segment arrives, the writer is flushed and `on_commit` receives a
+    checkpoint ({"pages_done", "pages_processed", "vectors_stored"}) covering
+    every page before it. Passing such a checkpoint as `resume` skips the pages
+    it covers (`pages` should start at most one page before them).
+    `on_status` is notified when the embedding and upserting stages start;
+    `on_progress` gets keyword updates as batches are written.
     """
     try:
-        print(f"Processing {len(pages)} pages for file_id: {file_id}")
-        vectors_to_upsert = []
-
-        for page in pages:
-            page_number = page["page"]
-            chunks = chunk_text(page["text"])
-            print(f"Page {page_number}: {len(chunks)} chunks")
-
-            if not chunks:
-                continue
-
-            embeddings = model.encode(chunks)
-
-            for i, emb in enumerate(embeddings):
-                vector_id = str(uuid.uuid4())
-                metadata = {
-                    "file_id": file_id,
-                    "page": page_number,
-                    "chunk_index": i,
-                    "text": chunks[i]
-                }
-
-                # Use new Pinecone API format
-                vectors_to_upsert.append({
-                    "id": vector_id,
-                    "values": emb.tolist(),
-                    "metadata": metadata
-                })
-
-        if not vectors_to_upsert:
-            print("No vectors to upsert!")
-            return {"vectors_stored": 0}
-
-        print(f"Upserting {len(vectors_to_upsert)} vectors to namespace: {file_id}")
-        # ✅ Upsert into Pinecone with new API format and namespace
-        index.upsert(vectors=vectors_to_upsert, namespace=file_id)
-        print(f"Successfully stored {len(vectors_to_upsert)} vectors")
+        batch_size = batch_size or EMBED_BATCH_SIZE
+        segment_pages = segment_pages or INGEST_SEGMENT_PAGES
+        resume = resume or {}
+        pages_done = resume.get("pages_done", 0)
+        logger.info("Embedding document", extra=log_fields(file_id=file_id, batch_size=batch_size, resume_after_page=pages_done))
+        if on_status:
+            on_status("embedding")
+
+        start = time.perf_counter()
+        stats = {"pages": 0, "page_numbers": []}
+        vectors_stored = 0
+        segment_end = (pages_done // segment_pages + 1) * segment_pages
+
+        batches = background(iter_chunk_batches(pages, batch_size, stats, skip_through=pages_done), name="chunker")
+        encoded = background(encode_batches(batches, batch_size), name="encoder")
+
+        with BulkUpserter(get_vector_store(), namespace=file_id) as writer:
+            for embeddings, metas in encoded:
+                if vectors_stored == 0 and on_status:
+                    on_status("upserting")
+
+                # One conversion per batch instead of one per vector
+                values = embeddings.tolist()
+                for i, meta in enumerate(metas):
+                    page = meta["page"]
+                    if page > segment_end:
+                        # Everything before this page's segment is written: commit it
+                        writer.flush()
+                        segment_end = (page - 1) // segment_pages * segment_pages + segment_pages
+                        # Every page up to the new boundary has been extracted by now; count
+                        # them the way the final total does, including pages without chunks
+                        extracted = bisect.bisect_right(stats["page_numbers"], segment_end - segment_pages)
+                        # Totals covered by this checkpoint, including earlier attempts
+                        committed = {
+                            "pages_done": segment_end - segment_pages,
+                            "pages_processed": resume.get("pages_processed", 0) + extracted,
+                            "vectors_stored": resume.get("vectors_stored", 0) + vectors_stored,
+                        }
+                        if on_commit:
+                            on_commit(committed)
+                    writer.add({
+                        "id": vector_id(file_id, page, meta["chunk_index"]),
+                        "values": values[i],
+                        "metadata": {"file_id": file_id, **meta}
+                    })
+                    vectors_stored += 1
+
+                if on_progress and metas:
+                    on_progress(current_page=metas[-1]["page"], vectors_stored=resume.get("vectors_stored", 0) + vectors_stored)
+
+        elapsed = time.perf_counter() - start
+        if not vectors_stored:
+            logger.warning("No vectors to upsert", extra=log_fields(file_id=file_id, pages=stats["pages"]))
+        else:
+            logger.info("Stored vectors", extra=log_fields(
+                file_id=file_id,
+                vectors=vectors_stored,
+                pages=stats["pages"],
+                seconds=round(elapsed, 3),
+                chunks_per_sec=round(vectors_stored / elapsed, 1),
+            ))
 
         return {
-            "vectors_stored": len(vectors_to_upsert)
+            "pages_processed": resume.get("pages_processed", 0) + stats["pages"],
+            "vectors_stored": resume.get("vectors_stored", 0) + vectors_stored,
+            "resumed_after_page": pages_done,
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_sec": round(vectors_stored / elapsed, 1) if elapsed > 0 else 0.0
         }
     
-    except Exception as e:
-        print(f"Error in embed_and_store: {e}")
-        raise e
+    except Exception:
+        logger.exception("Embedding failed", extra=log_fields(file_id=file_id))
+        raise
@@ -0,0 +1,324 @@
+"""
+Micro-batching Embedding Server
+
+Every encode in the process (query embeddings for /ask-question, chunk
+batches from ingestion) goes through one request queue. A single batching
+thread takes whatever is pending, waits up to EMBED_SERVER_MAX_WAIT_MS for more
+(or until EMBED_SERVER_MAX_BATCH texts are queued), runs one forward pass and
+hands every caller its rows. Concurrent single-question encodes share a batch
+instead of competing for the CPU cores with separate forward passes.
+
+Query texts are always taken before ingestion texts. Large ingestion requests
+are split across batches, so a query waits for at most one batch in progress.
+
+EMBED_SERVER_MODE:
+- thread (default): the forward pass runs on the batching thread
+- process: the forward pass runs in a spawned worker process holding its own
+  copy of the model, which keeps encoding off this process' GIL
+- off: callers encode directly, without batching
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from services.metrics import metrics_registry, observe_stage
+
+EMBED_SERVER_MODE = os.getenv("EMBED_SERVER_MODE", "thread").lower()
+EMBED_SERVER_MAX_BATCH = int(os.getenv("EMBED_SERVER_MAX_BATCH", "64"))
+EMBED_SERVER_MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "2"))
+
+QUERY = "query"
+INGEST = "ingest"
+PRIORITIES = (QUERY, INGEST)  # Highest first
+
+logger = logging.getLogger(__name__)
+
+batch_sizes = metrics_registry.histogram(
+    "embedding_batch_size", "Texts per forward pass of the embedding server.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+queue_seconds = metrics_registry.histogram(
+    "embedding_queue_seconds", "Time from submitting an encode request until its forward pass started.", ["priority"]
+)
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+class _Request:
+    __slots__ = ("texts", "priority", "future", "result", "remaining", "submitted_at", "started")
+
+    def __init__(self, texts: List[str], priority: str):
+        self.texts = texts
+        self.priority = priority
+        self.future: Future = Future()
+        self.result: Optional[np.ndarray] = None
+        self.remaining = len(texts)
+        self.submitted_at = time.perf_counter()
+        self.started = False
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        encoder: Encoder,
+        max_batch: int = EMBED_SERVER_MAX_BATCH,
+        max_wait_ms: float = EMBED_SERVER_MAX_WAIT_MS,
+        batching: bool = True,
+    ):
+        """
+        `encoder` turns a list of texts into a float32 matrix, one row per text.
+        With `batching=False` callers run it themselves (EMBED_SERVER_MODE=off).
+        """
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batching = batching
+
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # Async callers without batching still keep the event loop free
+        self._direct_executor = None if batching else ThreadPoolExecutor(
+            max_workers=int(os.getenv("QUERY_ENCODE_WORKERS", "2")), thread_name_prefix="query-encode"
+        )
+
+        self.batches = 0
+        self.texts = 0
+
+    def encode(self, texts: Sequence[str], priority: str = QUERY) -> np.ndarray:
+        """
+        Embeddings of `texts` as a float32 matrix. Blocks until they are computed.
+        """
+        if not self.batching:
+            return self._encode_now(list(texts))
+        return self.submit(texts, priority).result()
+
+    async def aencode(self, texts: Sequence[str], priority: str = QUERY) -> np.ndarray:
+        if not self.batching:
+            return await asyncio.get_running_loop().run_in_executor(self._direct_executor, self._encode_now, list(texts))
+        return await asyncio.wrap_future(self.submit(texts, priority))
+
+    def submit(self, texts: Sequence[str], priority: str = QUERY) -> Future:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        request = _Request(list(texts), priority)
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype=np.float32))
+            return request.future
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Embedding server is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-server", daemon=True)
+                self._thread.start()
+            # [request, offset of its first text not yet in a batch]
+            self._queues[priority].append([request, 0])
+            self._pending += len(request.texts)
+            self._cond.notify()
+        return request.future
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._direct_executor is not None:
+            self._direct_executor.shutdown(wait=False)
+        close = getattr(self.encoder, "close", None)
+        if close:
+            close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = {priority: sum(len(r.texts) - offset for r, offset in queue) for priority, queue in self._queues.items()}
+        return {
+            "mode": EMBED_SERVER_MODE if self.batching else "off",
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "queued": queued,
+        }
+
+    def _encode_now(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.encoder(texts), dtype=np.float32)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                # Give concurrent callers a moment to join this batch
+                deadline = time.perf_counter() + self.max_wait
+                while self._pending < self.max_batch and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take(self.max_batch)
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Fail this batch's callers, but keep serving: this is the only batching thread
+                logger.exception("Embedding batch failed")
+                for request, _, _ in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _take(self, capacity: int) -> list:
+        # (request, start, end) slices, highest priority first
+        batch = []
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and capacity:
+                entry = queue[0]
+                request, offset = entry
+                # Claim the future before its first slice is encoded: once running it
+                # can no longer be cancelled (e.g. by a disconnected client's
+                # asyncio wrapper), so setting its result later can't race with that
+                if offset == 0 and not request.future.set_running_or_notify_cancel():
+                    queue.popleft()
+                    self._pending -= len(request.texts)
+                    continue
+                end = min(len(request.texts), offset + capacity)
+                batch.append((request, offset, end))
+                capacity -= end - offset
+                self._pending -= end - offset
+                if end == len(request.texts):
+                    queue.popleft()
+                else:
+                    entry[1] = end
+        return batch
+
+    def _process(self, batch: list):
+        texts = []
+        now = time.perf_counter()
+        for request, start, end in batch:
+            if not request.started:
+                request.started = True
+                queue_seconds.observe(now - request.submitted_at, priority=request.priority)
+            texts.extend(request.texts[start:end])
+
+        try:
+            started = time.perf_counter()
+            vectors = self._encode_now(texts)
+            observe_stage("embedding_batch", time.perf_counter() - started, texts=len(texts))
+        except Exception as e:
+            logger.exception("Embedding batch failed")
+            for request, _, _ in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        batch_sizes.observe(len(texts))
+
+        row = 0
+        for request, start, end in batch:
+            count = end - start
+            if request.future.done():
+                # Failed in an earlier batch; its remaining slices are dropped
+                row += count
+                continue
+            if request.result is None:
+                request.result = np.empty((len(request.texts), vectors.shape[1]), dtype=np.float32)
+            request.result[start:end] = vectors[row:row + count]
+            row += count
+            request.remaining -= count
+            if request.remaining == 0:
+                request.future.set_result(request.result)
+
+
+class ProcessEncoder:
+    """
+    Runs the forward pass in a spawned worker process. `factory` builds the
+    model inside the worker and must be picklable (a module-level function).
+    Only the batching thread talks to the worker, so the pipe needs no lock.
+    """
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self._ctx = multiprocessing.get_context("spawn")
+        self._conn = None
+        self._process = None
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        if self._process is None or not self._process.is_alive():
+            self._start()
+        try:
+            self._conn.send(texts)
+            status, payload = self._conn.recv()
+        except (EOFError, OSError) as e:
+            self._process = None
+            raise RuntimeError(f"Embedding worker process exited: {e}")
+        if status == "error":
+            raise RuntimeError(f"Embedding worker failed: {payload}")
+        return payload
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process = None
+
+    def _start(self):
+        self._conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(target=_serve, args=(child_conn, self.factory), name="embedding-worker", daemon=True)
+        self._process.start()
+        child_conn.close()
+
+
+def _serve(conn, factory: Callable):
+    model = factory()
+    while True:
+        try:
+            texts = conn.recv()
+        except EOFError:
+            return
+        if texts is None:
+            return
+        try:
+            vectors = model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+            conn.send(("ok", np.asarray(vectors, dtype=np.float32)))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+def _encode_with_registry_model(texts: List[str]) -> np.ndarray:
+    from clients.registry import get_embedding_model
+    return get_embedding_model().encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+def create_embedding_server(mode: str = EMBED_SERVER_MODE, model_factory: Optional[Callable] = None) -> EmbeddingServer:
+    """
+    Build the server for EMBED_SERVER_MODE. Called once per process through the
+    registry; `model_factory` loads the model inside the worker process.
+    """
+    if mode == "off":
+        return EmbeddingServer(_encode_with_registry_model, batching=False)
+    if mode == "thread":
+        return EmbeddingServer(_encode_with_registry_model)
+    if mode == "process":
+        return EmbeddingServer(ProcessEncoder(model_factory))
+    raise ValueError(f"Unknown EMBED_SERVER_MODE: {mode}")
@@ -1,19 +1,128 @@
 import fitz  # PyMuPDF
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Union
 
-def extract_text_from_pdf(file_path: str) -> list[dict]:
+PDFSource = Union[str, bytes, bytearray, memoryview]
+
+# Documents with at least this many pages are extracted on a process pool
+PARALLEL_MIN_PAGES = int(os.getenv("EXTRACT_PARALLEL_MIN_PAGES", "200"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages handed to a worker per task, and how many tasks may be in flight at once
+PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "16"))
+INFLIGHT_WINDOW = int(os.getenv("EXTRACT_INFLIGHT_WINDOW", "8"))
+
+
+def open_pdf(source: PDFSource) -> fitz.Document:
+    """
+    Opens a PDF from a file path or directly from an in-memory buffer,
+    so uploaded bytes never have to be written to disk first.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def count_pages(source: PDFSource) -> int:
+    doc = open_pdf(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def iter_pages(source: PDFSource, start: int = 0) -> Iterator[dict]:
+    """
+    Yields page dicts ({"page", "text"}) one at a time as they are parsed,
+    beginning at the 0-based page index `start`. Empty pages are skipped.
+    """
+    doc = open_pdf(source)
+    try:
+        for i in range(start, doc.page_count):
+            text = doc[i].get_text().strip()
+            if text:
+                yield {
+                    "page": i + 1,
+                    "text": text
+                }
+    finally:
+        doc.close()
+
+
+def iter_pages_parallel(
+    source: PDFSource,
+    start: int = 0,
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+    window: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Extracts page ranges on a process pool and yields pages in page order.
+    Every worker opens the document itself once; at most `window` page ranges
+    are in flight, which bounds memory regardless of document size.
+    """
+    workers = workers or EXTRACT_WORKERS
+    pages_per_task = pages_per_task or PAGES_PER_TASK
+    window = max(window or INFLIGHT_WINDOW, workers)
+
+    page_count = count_pages(source)
+    ranges = iter([(first, min(first + pages_per_task, page_count)) for first in range(start, page_count, pages_per_task)])
+
+    # spawn instead of fork: the server process runs threads (ingestion pool, torch)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(source,)) as pool:
+        in_flight = deque()
+        for page_range in ranges:
+            in_flight.append(pool.submit(_extract_range, *page_range))
+            if len(in_flight) >= window:
+                break
+
+        while in_flight:
+            # Results come back in submission order, so pages stay ordered
+            pages = in_flight.popleft().result()
+            next_range = next(ranges, None)
+            if next_range:
+                in_flight.append(pool.submit(_extract_range, *next_range))
+            yield from pages
+
+
+def extract_pages(source: PDFSource, start: int = 0) -> Iterator[dict]:
+    """
+    Streams pages from a PDF, beginning at the 0-based page index `start`,
+    switching to the process pool when many pages remain.
+    """
+    if EXTRACT_WORKERS > 1 and count_pages(source) - start >= PARALLEL_MIN_PAGES:
+        return iter_pages_parallel(source, start)
+    return iter_pages(source, start)
+
+
+def extract_text_from_pdf(source: PDFSource) -> list[dict]:
     """
     Extracts text from a PDF and returns a list of page-wise text chunks.
     Each item is a dict with page number and content.
+    `source` may be a file path or the raw PDF bytes.
     """
-    doc = fitz.open(file_path)
-    extracted = []
+    return list(iter_pages(source))
+
+
+# Worker-side state for iter_pages_parallel: one open document per process
+_worker_doc = None
+
 
-    for i, page in enumerate(doc, start=1):
-        text = page.get_text().strip()
+def _init_worker(source: PDFSource):
+    global _worker_doc
+    _worker_doc = open_pdf(source)
+
+
+def _extract_range(start: int, end: int) -> list[dict]:
+    extracted = []
+    for i in range(start, end):
+        text = _worker_doc[i].get_text().strip()
         if text:
             extracted.append({
-                "page": i,
+                "page": i + 1,
                 "text": text
             })
-
     return extracted
@@ -0,0 +1,213 @@
+"""
+Background Ingestion Jobs
+
+PDF ingestion (download, text extraction, embedding and the Pinecone upsert)
+is CPU and network heavy, so it runs on a bounded worker pool instead of the
+event loop. Every submission gets a job record that moves through
+queued -> extracting -> embedding -> upserting -> done/failed and can be polled
+through GET /jobs/{job_id} or followed as a server-sent event stream through
+GET /jobs/{job_id}/events. Jobs also publish a `progress` dict (page count,
+committed pages, vectors stored) while they run.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from services.telemetry import log_fields
+
+JOB_STATUSES = ("queued", "extracting", "embedding", "upserting", "done", "failed")
+FINISHED_STATUSES = ("done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when the ingestion queue already holds the maximum number of pending jobs."""
+
+
+class JobWatcher:
+    """
+    Follows one job from the event loop. Worker threads publish snapshots and
+    only the latest is kept, so a slow reader never holds up ingestion.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._changed = asyncio.Event()
+        self._latest: Optional[dict] = None
+
+    def publish(self, job: dict):
+        # Called from any thread
+        self._latest = job
+        try:
+            self._loop.call_soon_threadsafe(self._changed.set)
+        except RuntimeError:
+            pass  # The loop is closed, nobody is listening
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """
+        The latest snapshot once the job changed, or None after `timeout` seconds.
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._changed.clear()
+        return self._latest
+
+
+class JobManager:
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None, history_limit: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("INGEST_WORKERS", "2"))
+        self.max_pending = max_pending or int(os.getenv("INGEST_MAX_PENDING", "16"))
+        self.history_limit = history_limit or int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        fn: Callable,
+        file_id: str,
+        on_done: Optional[Callable[[dict], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        reserved: bool = False,
+    ) -> dict:
+        """
+        Queue an ingestion function and return its job record.
+        `fn` receives an `update(status=None, **progress)` callback and returns
+        the processing result. With `reserved`, the job takes the queue slot
+        held by an earlier `reserve()` instead of claiming a new one.
+        """
+        with self._lock:
+            if not reserved:
+                self._claim_slot()
+
+            now = time.time()
+            job = {
+                "job_id": str(uuid.uuid4()),
+                "file_id": file_id,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "progress": {},
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._jobs[job["job_id"]] = job
+            self._trim_history()
+
+        # Run in the submitting request's context so the job's logs carry its request id
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._run, job["job_id"], fn, on_done, on_error)
+        return dict(job)
+
+    def reserve(self):
+        """
+        Hold a queue slot for a job that will be submitted after some async
+        setup, so the setup is skipped when the queue is full. Raises
+        JobQueueFull; pass `reserved=True` to submit() or call release().
+        """
+        with self._lock:
+            self._claim_slot()
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+
+    def _claim_slot(self):
+        if self._active >= self.max_workers + self.max_pending:
+            raise JobQueueFull("Too many PDFs are being processed, please retry shortly")
+        self._active += 1
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def watch(self, job_id: str) -> Optional[JobWatcher]:
+        """
+        Subscribe to a job's updates from the event loop; the current state is
+        delivered first. Returns None for an unknown job.
+        """
+        watcher = JobWatcher(asyncio.get_running_loop())
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._watchers.setdefault(job_id, set()).add(watcher)
+            watcher.publish(dict(job))
+        return watcher
+
+    def unwatch(self, job_id: str, watcher: JobWatcher):
+        with self._lock:
+            watchers = self._watchers.get(job_id)
+            if watchers:
+                watchers.discard(watcher)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _update(self, job_id: str, progress: Optional[dict] = None, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if progress:
+                # Replaced, not mutated, so snapshots handed out stay consistent
+                job["progress"] = {**job["progress"], **progress}
+            job["updated_at"] = time.time()
+            snapshot = dict(job)
+            watchers = list(self._watchers.get(job_id, ()))
+        for watcher in watchers:
+            watcher.publish(snapshot)
+
+    def _run(self, job_id: str, fn: Callable, on_done, on_error):
+        def update(status: Optional[str] = None, **progress):
+            if status is None:
+                self._update(job_id, progress=progress)
+                return
+            if status not in JOB_STATUSES:
+                raise ValueError(f"Unknown job status: {status}")
+            self._update(job_id, progress=progress, status=status)
+
+        try:
+            result = fn(update)
+            if on_done:
+                on_done(result)
+            self._update(job_id, status="done", result=result)
+        except Exception as e:
+            logger.exception("Ingestion job failed", extra=log_fields(job_id=job_id))
+            if on_error:
+                try:
+                    on_error(e)
+                except Exception:
+                    logger.exception("Ingestion job error callback failed", extra=log_fields(job_id=job_id))
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the history limit is reached
+        overflow = len(self._jobs) - self.history_limit
+        if overflow <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job["status"] in FINISHED_STATUSES][:overflow]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -2,165 +2,153 @@
 LLaMA Query Service
 
 This module provides AI-powered question answering capabilities that combine:
-1. Document-specific context from uploaded PDFs (via Pinecone vector search)
+1. Document-specific context from uploaded PDFs (via vector search in Pinecone
+   or the local vector store)
 2. General knowledge from the LLaMA language model
 3. Real-time streaming responses for ChatGPT-like experience
 
 The system intelligently classifies questions and provides natural responses
-without explicitly mentioning the source of information. Server-side streaming
-ensures the typing effect only occurs once when the response is first generated.
+without explicitly mentioning the source of information. Answers are streamed
+token by token as the LLM generates them.
 """
 
 import os
+import time
 import asyncio
-from llama_index.vector_stores.pinecone import PineconeVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core import VectorStoreIndex, Settings
-from llama_index.llms.groq import Groq
-from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.core.retrievers import VectorIndexRetriever
+import contextlib
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from llama_index.core.llms import ChatMessage
+from llama_index.core.embeddings import BaseEmbedding
 from dotenv import load_dotenv
-from pinecone import Pinecone
+from typing import AsyncIterator, List, Optional, Sequence, Union
+from clients.registry import get_embedding_server, get_vector_store, get_llm
+from services.vector_store import Retriever, merge_top_k
+from services.cache import LRUCache
+from services.embedding_server import QUERY
+from services.answer_cache import answer_cache
+from services.query_router import RouteDecision, route_question, refine_route, route_latency
+from services.metrics import observe_stage, span, stage_errors
+from services.telemetry import log_fields
 
 # Load environment variables
 load_dotenv()
 
-# ✅ Set up Pinecone with modern API
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-pinecone_index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+logger = logging.getLogger(__name__)
+
+# ✅ Query embeddings are cached by normalized text, so repeated and common
+# questions ("summarize this document") skip the model entirely
+query_embedding_cache = LRUCache(
+    maxsize=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096")),
+    name="query_embedding",
+)
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
 
-# ✅ Set up embedding model using sentence-transformers directly
-from sentence_transformers import SentenceTransformer
-from llama_index.core.embeddings import BaseEmbedding
-from typing import List
 
+def _cache_vectors(keys: List[str], encoded: np.ndarray) -> dict:
+    vectors = {}
+    for key, vector in zip(keys, np.asarray(encoded, dtype=np.float32)):
+        vector.setflags(write=False)
+        query_embedding_cache.set(key, vector)
+        vectors[key] = vector
+    return vectors
+
+
+# ✅ Embedding model backed by the shared embedding server from the registry,
+# so concurrent questions share forward passes and jump ahead of ingestion
 class SentenceTransformerEmbedding(BaseEmbedding):
-    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5", **kwargs):
-        super().__init__(**kwargs)
-        self._model = SentenceTransformer(model_name)
-        
+    def get_query_vector(self, query: str) -> np.ndarray:
+        """
+        Cached float32 embedding of a query. The returned array is read-only.
+        """
+        return self.get_query_vectors([query])[0]
+
+    def get_query_vectors(self, queries: List[str]) -> List[np.ndarray]:
+        """
+        Cached embeddings of several queries; the cache misses are encoded in
+        a single batched forward pass.
+        """
+        keys, vectors, missing = self._lookup(queries)
+        if missing:
+            vectors.update(_cache_vectors(missing, get_embedding_server().encode(missing, QUERY)))
+        return [vectors[key] for key in keys]
+
+    async def aget_query_vector(self, query: str) -> np.ndarray:
+        return (await self.aget_query_vectors([query]))[0]
+
+    async def aget_query_vectors(self, queries: List[str]) -> List[np.ndarray]:
+        keys, vectors, missing = self._lookup(queries)
+        if missing:
+            vectors.update(_cache_vectors(missing, await get_embedding_server().aencode(missing, QUERY)))
+        return [vectors[key] for key in keys]
+
+    def _lookup(self, queries: List[str]):
+        keys = [normalize_query(query) for query in queries]
+        vectors = {key: query_embedding_cache.get(key) for key in keys}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        return keys, vectors, missing
+
     def _get_query_embedding(self, query: str) -> List[float]:
-        return self._model.encode([query])[0].tolist()
+        return self.get_query_vector(query).tolist()
         
     def _get_text_embedding(self, text: str) -> List[float]:
-        return self._model.encode([text])[0].tolist()
-        
+        return get_embedding_server().encode([text], QUERY)[0].tolist()
+
     async def _aget_query_embedding(self, query: str) -> List[float]:
-        return self._get_query_embedding(query)
+        return (await self.aget_query_vector(query)).tolist()
         
     async def _aget_text_embedding(self, text: str) -> List[float]:
-        return self._get_text_embedding(text)
+        return (await get_embedding_server().aencode([text], QUERY))[0].tolist()
 
 embed_model = SentenceTransformerEmbedding()
 
-# ✅ Set up LLM (Groq + LLaMA3)
-llm = Groq(api_key=os.getenv("GROQ_API_KEY"), model="llama3-8b-8192")
-
-# ✅ Configure global settings for LlamaIndex
-Settings.llm = llm
-Settings.embed_model = embed_model
+RETRIEVAL_TOP_K = 5
+# How long an uncertain (hybrid) question waits for document context before
+# answering without it. Unset or 0 waits for retrieval, like document questions.
+HYBRID_RETRIEVAL_TIMEOUT = float(os.getenv("HYBRID_RETRIEVAL_TIMEOUT") or 0) or None
+# Namespace queries run here, so a multi-document question fans out to all
+# of its namespaces at once instead of queueing on the default thread pool
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "32")),
+    thread_name_prefix="retrieval",
+)
+# Upper bound on file_ids in one multi-document question
+MAX_QUERY_FILES = int(os.getenv("MAX_QUERY_FILES", "50"))
+# Concurrent LLM calls per batch request (POST /ask-question/batch)
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
 
 
 def classify_question_type(question: str) -> str:
     """
     Classify the question to determine the best answering approach
     """
-    question_lower = question.lower()
-    
-    # Document-specific indicators
-    doc_indicators = [
-        "in this document", "pdf", "in the pdf", "according to this", "in the file",
-        "what does this say", "summarize this", "what is this about",
-        "in the text", "the document says", "this paper", "this report", "document"
-    ]
-    
-    # General knowledge indicators  
-    general_indicators = [
-        "what is", "how does", "why does", "explain", "define",
-        "what are the benefits", "what are the advantages", "tell me about",
-        "how to", "what causes", "what happens when"
-    ]
-    
-    # Check for document-specific language
-    for indicator in doc_indicators:
-        if indicator in question_lower:
-            return "document_specific"
-    
-    # Check for general knowledge language
-    for indicator in general_indicators:
-        if indicator in question_lower:
-            return "general_knowledge"
-    
-    # Default to hybrid approach
-    return "hybrid"
-
-
-async def _ask_question_internal(file_id: str, question: str) -> str:
-    try:
-        print(f"Querying for file_id: {file_id}, question: {question}")
-        
-        # Validate file_id
-        if not file_id or file_id.strip() == "":
-            print("Error: Empty file_id provided")
-            return "I apologize, but I don't see a PDF document attached to this conversation. Could you please upload a PDF file first, or provide more context about what document you're referring to?"
-        
-        # ✅ Connect LlamaIndex to Pinecone vector store
-        vector_store = PineconeVectorStore(
-            pinecone_index=pinecone_index,
-            namespace=file_id  # 🧠 Filters chunks related to this file only
-        )
-
-        # ✅ Create index object
-        index = VectorStoreIndex.from_vector_store(vector_store=vector_store)
-
-        # ✅ Set up retriever with top-k chunks
-        retriever = VectorIndexRetriever(
-            index=index,
-            similarity_top_k=5
-        )        # Classify the question type
-        question_type = classify_question_type(question)
-        print(f"Question classified as: {question_type}")
-        
-        # ✅ Get relevant context from PDF
-        print(f"Retrieving context from PDF...")
-        retrieved_nodes = retriever.retrieve(question)
-        
-        # Extract text context from retrieved nodes
-        pdf_context = ""
-        if retrieved_nodes:
-            pdf_context = "\n\n".join([node.text for node in retrieved_nodes])
-            print(f"Retrieved {len(retrieved_nodes)} relevant chunks from PDF")
-        else:
-            print("No relevant context found in PDF")
-        # ✅ Create prompts based on question type and available context
-        if question_type == "document_specific":
-            # User explicitly asking about the document
-            if pdf_context.strip():
-                prompt = f"""Answer the following question based on the provided context. Be natural and conversational in your response.
+    return route_question(question).route
 
-Context:
-{pdf_context}
 
-Question: {question}
+NO_DOCUMENT_MESSAGE = "I apologize, but I don't see a PDF document attached to this conversation. Could you please upload a PDF file first, or provide more context about what document you're referring to?"
+ERROR_MESSAGE = "I apologize, but I encountered an error processing your question. Please try rephrasing your question or try again later."
 
-Answer:"""
-            else:
-                # Return response directly instead of sending to LLM
-                return "I apologize, but I don't see a PDF document attached to this conversation. Could you please upload a PDF file first, or provide more context about what document you're referring to?"
-                
-        elif question_type == "general_knowledge":
-            # User asking general knowledge question
-            prompt = f"""Answer the following question in a helpful and informative way.
+
+def _general_prompt(question: str) -> str:
+    return f"""Answer the following question in a helpful and informative way.
 
 Question: {question}
 
 Answer:"""
-            
-        else:  # hybrid approach
-            # Question could benefit from both document context and general knowledge
-            if pdf_context.strip():
-                prompt = f"""Answer the following question using the provided context and your knowledge. Be natural and comprehensive in your response.
+
+
+def _build_prompt(question_type: str, question: str, pdf_context: str):
+    """
+    Create the prompt for the question type and available context.
+    Returns None when the question needs a document but no context was found.
+    """
+    if question_type == "document_specific":
+        # User explicitly asking about the document
+        if pdf_context.strip():
+            return f"""Answer the following question based on the provided context. Be natural and conversational in your response.
 
 Context:
 {pdf_context}
@@ -168,53 +156,281 @@ Context:
 Question: {question}
 
 Answer:"""
-            else:
-                prompt = f"""Answer the following question in a helpful and informative way.
+        return None
 
-Question: {question}
+    if question_type == "general_knowledge":
+        # User asking general knowledge question
+        return _general_prompt(question)
 
-Answer:"""        # ✅ Query the LLM directly with our custom prompt
-        print(f"Querying LLM with {question_type} approach...")
-        
-        messages = [ChatMessage(role="user", content=prompt)]
-        response = await llm.achat(messages)
-        response_str = str(response)
-        
-        print(f"LLM response: {response_str[:200]}...")
-        return response_str
-        
-    except Exception as e:
-        print(f"Error in ask_question: {e}")
-        # Fallback: Try with just general knowledge
-        try:
-            print("Falling back to general knowledge only...")
-            fallback_prompt = f"""Answer the following question in a helpful and informative way.
+    # hybrid approach: question could benefit from both document context and general knowledge
+    if pdf_context.strip():
+        return f"""Answer the following question using the provided context and your knowledge. Be natural and comprehensive in your response.
+
+Context:
+{pdf_context}
 
 Question: {question}
 
 Answer:"""
+    return _general_prompt(question)
+
+
+def get_retriever(file_id: str, top_k: int = RETRIEVAL_TOP_K) -> Retriever:
+    """
+    Retriever for a file. It only binds the namespace; the vector store keeps
+    whatever per-namespace state is worth reusing (the local store's loaded maps).
+    """
+    # 🧠 The file's namespace holds only chunks related to this file
+    return Retriever(get_vector_store(), namespace=file_id, top_k=top_k)
+
+
+def _retrieve_matches(file_id: str, question_vector: np.ndarray) -> List[dict]:
+    """
+    Top chunks for the question from one file's namespace.
+    Blocking (vector store query), so callers run it in a thread.
+    """
+    retriever = get_retriever(file_id)
+    with span("retrieval", file_id=file_id):
+        return retriever.retrieve(question_vector)
 
-            messages = [ChatMessage(role="user", content=fallback_prompt)]
-            response = await llm.achat(messages)
-            return str(response)
-        except Exception as fallback_error:
-            print(f"Fallback error: {fallback_error}")
-            return "I apologize, but I encountered an error processing your question. Please try rephrasing your question or try again later."
 
+async def _retrieve_context(file_ids: List[str], question_vector: np.ndarray) -> str:
+    """
+    Retrieve the top chunks for the question across the files' namespaces.
+    The namespaces are queried concurrently and their matches merged into one
+    global top-k, so the wait is the slowest namespace, not the sum.
+    """
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_retrieval_executor, _retrieve_matches, file_id, question_vector)
+        for file_id in file_ids
+    ))
+    matches = results[0] if len(results) == 1 else merge_top_k(results, RETRIEVAL_TOP_K)
 
-async def ask_question_stream(file_id: str, question: str):
+    # Extract text context from retrieved chunks
+    logger.info("Retrieved context", extra=log_fields(files=len(file_ids), matches=len(matches)))
+    if not matches:
+        return ""
+    return "\n\n".join([match["metadata"].get("text", "") for match in matches])
+
+
+async def _stream_llm(prompt: str):
     """
-    Stream the response character by character for real-time display
+    Stream the LLM answer for a prompt, yielding text deltas as they arrive.
+    Records time to the first token and to the end of the answer.
     """
+    started_at = time.perf_counter()
+    first_token = True
+    messages = [ChatMessage(role="user", content=prompt)]
     try:
-        # Get the full response first
-        full_response = await _ask_question_internal(file_id, question)
+        response_stream = await get_llm().astream_chat(messages)
+        async for response in response_stream:
+            if response.delta:
+                if first_token:
+                    observe_stage("llm_first_token", time.perf_counter() - started_at)
+                    first_token = False
+                yield response.delta
+    except Exception:
+        stage_errors.inc(stage="llm_completion")
+        raise
+    observe_stage("llm_completion", time.perf_counter() - started_at)
+
+
+def _split_for_streaming(text: str, words_per_piece: int = 4):
+    """
+    Split a cached answer into small word groups so it streams like a live one.
+    """
+    words = text.split(" ")
+    for start in range(0, len(words), words_per_piece):
+        piece = " ".join(words[start:start + words_per_piece])
+        yield piece if start + words_per_piece >= len(words) else piece + " "
+
+
+def _clean_file_ids(file_ids: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Non-empty file ids, de-duplicated in order. Accepts a single id.
+    """
+    if isinstance(file_ids, str):
+        file_ids = [file_ids]
+    return list(dict.fromkeys(file_id.strip() for file_id in file_ids if file_id and file_id.strip()))
+
+
+async def _ask_question_internal(
+    file_ids: Union[str, Sequence[str]],
+    question: str,
+    question_vector: Optional[np.ndarray] = None,
+    llm_slots: Optional[asyncio.Semaphore] = None,
+    decision: Optional[RouteDecision] = None,
+    fallback: bool = True,
+):
+    """
+    Route the question, retrieve context only when the route needs it, then
+    stream the Groq answer token by token.
+    Falls back to a general-knowledge answer if anything fails before the
+    first token was sent.
+    With several file ids the context is the best chunks across all of them.
+    `question_vector` and `decision` skip the query encode and the routing
+    when the caller already has them; `llm_slots` bounds how many LLM calls
+    run at once. With `fallback=False` failures are raised instead of answered.
+    """
+    llm_slots = llm_slots or contextlib.nullcontext()
+    answer_started = False
+    route = "unrouted"
+    started_at = time.perf_counter()
+    try:
+        file_ids = _clean_file_ids(file_ids)
+        logger.info("Answering question", extra=log_fields(file_ids=file_ids, question_chars=len(question)))
+
+        # Validate file_ids
+        if not file_ids:
+            logger.warning("Empty file_id provided")
+            yield NO_DOCUMENT_MESSAGE
+            return
+        # Cached answers are kept per file, so multi-document questions bypass them
+        cache_file_id = file_ids[0] if len(file_ids) == 1 else None
+
+        # ✅ Route before doing any retrieval work
+        decision = decision or route_question(question)
+        route = decision.route
+
+        retrieval = None
+        if decision.route == "general_knowledge":
+            question_vector = None
+        elif question_vector is None:
+            with span("query_embedding"):
+                question_vector = await embed_model.aget_query_vector(question)
+
+        if question_vector is not None:
+            # ✅ Serve near-identical questions about this file from the answer cache
+            cached_answer = answer_cache.lookup(cache_file_id, question_vector) if cache_file_id else None
+            if cached_answer is not None:
+                route = "answer_cache"
+                for piece in _split_for_streaming(cached_answer):
+                    yield piece
+                return
+
+            if not decision.certain:
+                # Uncertain: start retrieval now, concurrently with route
+                # refinement and prompt preparation
+                retrieval = asyncio.create_task(_retrieve_context(file_ids, question_vector))
+                decision = refine_route(decision, question_vector)
+                route = decision.route
+                if decision.route == "general_knowledge":
+                    retrieval.cancel()
+
+        question_type = decision.route
+        logger.info("Question routed", extra=log_fields(route=question_type, source=decision.source))
+
+        # ✅ Get relevant context from PDF without blocking the event loop
+        if question_type == "general_knowledge":
+            pdf_context = ""
+        elif question_type == "document_specific":
+            pdf_context = await (retrieval or _retrieve_context(file_ids, question_vector))
+        else:
+            # Optionally, don't let a slow retrieval hold back an answer that may not need it
+            try:
+                pdf_context = await asyncio.wait_for(retrieval, timeout=HYBRID_RETRIEVAL_TIMEOUT)
+            except Exception as e:
+                logger.info("Answering without document context", extra=log_fields(reason=type(e).__name__))
+                pdf_context = ""
+
+        # ✅ Create prompts based on question type and available context
+        prompt = _build_prompt(question_type, question, pdf_context)
+        if prompt is None:
+            # Return response directly instead of sending to LLM
+            yield NO_DOCUMENT_MESSAGE
+            return
+
+        # ✅ Stream the LLM answer for our custom prompt
+        answer_tokens = []
+        async with llm_slots:
+            async for token in _stream_llm(prompt):
+                answer_started = True
+                answer_tokens.append(token)
+                yield token
+
+        # Only answers grounded in this file's context are worth reusing for it
+        if pdf_context and cache_file_id:
+            answer_cache.store(cache_file_id, question_vector, "".join(answer_tokens))
         
-        # Stream character by character with a slight delay for realistic typing effect
-        for char in full_response:
-            yield char
-            await asyncio.sleep(0.02)  # 20ms delay between characters for natural typing
+    except Exception:
+        if not fallback:
+            raise
+        logger.exception("Answering failed", extra=log_fields(file_ids=file_ids, route=route, answer_started=answer_started))
+        if answer_started:
+            # Part of the answer already reached the client, don't start over
+            yield f"\n\n{ERROR_MESSAGE}"
+            return
+
+        # Fallback: Try with just general knowledge
+        try:
+            logger.info("Falling back to general knowledge")
+            async with llm_slots:
+                async for token in _stream_llm(_general_prompt(question)):
+                    answer_started = True
+                    yield token
+        except Exception:
+            logger.exception("General knowledge fallback failed")
+            yield f"\n\n{ERROR_MESSAGE}" if answer_started else ERROR_MESSAGE
+
+    finally:
+        route_latency.observe(time.perf_counter() - started_at, route=route)
+        logger.info("Question answered", extra=log_fields(route=route, seconds=round(time.perf_counter() - started_at, 3)))
+
+
+async def ask_question_stream(file_ids: Union[str, Sequence[str]], question: str):
+    """
+    Stream the response token by token as the LLM generates it.
+    `file_ids` is one file id or several to answer across documents.
+    """
+    try:
+        async for token in _ask_question_internal(file_ids, question):
+            yield token
             
     except Exception as e:
-        print(f"Error in ask_question_stream: {e}")
+        logger.exception("Streaming the answer failed")
         yield f"Error processing question: {str(e)}"
+
+
+async def ask_questions_batch(file_id: str, questions: List[str], llm_concurrency: int = BATCH_LLM_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Answer several questions about one file, yielding one result per question
+    as soon as it completes: {"index", "question", "answer"} or {"index",
+    "question", "error"}.
+    The questions that need retrieval are encoded in one batched forward pass,
+    their vector queries run concurrently, and at most `llm_concurrency` LLM
+    calls are in flight.
+    """
+    decisions = [route_question(question) for question in questions]
+    needs_vector = [decision.route != "general_knowledge" for decision in decisions]
+    to_encode = [question for question, needed in zip(questions, needs_vector) if needed]
+    vectors = iter([])
+    if to_encode:
+        with span("query_embedding", batch=len(to_encode)):
+            vectors = iter(await embed_model.aget_query_vectors(to_encode))
+
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+
+    async def answer(index: int, question: str, question_vector: Optional[np.ndarray], decision: RouteDecision) -> dict:
+        try:
+            # Failures are reported on the question's line rather than answered with an apology
+            tokens = [
+                token async for token in
+                _ask_question_internal(file_id, question, question_vector, llm_slots, decision=decision, fallback=False)
+            ]
+            return {"index": index, "question": question, "answer": "".join(tokens)}
+        except Exception as e:
+            logger.exception("Batch question failed", extra=log_fields(file_id=file_id, index=index))
+            return {"index": index, "question": question, "error": str(e)}
+
+    tasks = [
+        asyncio.create_task(answer(index, question, next(vectors) if needed else None, decision))
+        for index, (question, needed, decision) in enumerate(zip(questions, needs_vector, decisions))
+    ]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        # The client went away: don't keep paying for answers nobody reads
+        for task in tasks:
+            task.cancel()
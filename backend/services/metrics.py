@@ -0,0 +1,222 @@
+"""
+Prometheus-style metrics and timing spans.
+
+A small in-process registry of counters and histograms, rendered in the
+Prometheus text exposition format by GET /metrics. Pipeline stages (download,
+extraction, chunking, encoding, upsert, retrieval, LLM first token and
+completion) are timed with `span()` / `timed_iter()` into a single
+`stage_duration_seconds` histogram labelled by stage.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Sequence, Tuple, TypeVar
+
+from services.telemetry import log_fields
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus' default buckets, extended for downloads and long LLM answers
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(key, value) for key, value in series)
+        return "\n".join(lines)
+
+    def _render_series(self, key, value) -> str:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, optionally split by labels.
+    """
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+    def _render_series(self, key, value) -> str:
+        return f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram of observed values (seconds), optionally split by labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # Buckets are inclusive upper bounds; the extra slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def summary(self) -> dict:
+        """
+        Count, total and average per label set (keyed by the joined label values).
+        """
+        with self._lock:
+            return {
+                ",".join(key) or self.name: {
+                    "count": count,
+                    "total_seconds": round(total, 4),
+                    "avg_seconds": round(total / count, 4) if count else 0.0,
+                }
+                for key, (_, total, count) in self._series.items()
+            }
+
+    def _render_series(self, key, value) -> str:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    Named metrics, created once and shared by every module that records them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+
+metrics_registry = MetricsRegistry()
+
+stage_seconds = metrics_registry.histogram(
+    "stage_duration_seconds", "Duration of one operation in an ingestion or query stage.", ["stage"]
+)
+stage_errors = metrics_registry.counter(
+    "stage_errors_total", "Operations that raised inside an ingestion or query stage.", ["stage"]
+)
+
+
+def observe_stage(stage: str, seconds: float, **fields):
+    stage_seconds.observe(seconds, stage=stage)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("span", extra=log_fields(stage=stage, seconds=round(seconds, 6), **fields))
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Time the enclosed block as one operation of `stage`. Works around `await`s too.
+    Extra keyword arguments are added to the debug log line, not to the metric.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, **fields)
+
+
+def timed_iter(iterable: Iterable[T], stage: str) -> Iterator[T]:
+    """
+    Yields the items of `iterable`, timing how long producing each one took.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception:
+                stage_errors.inc(stage=stage)
+                raise
+            observe_stage(stage, time.perf_counter() - start)
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
@@ -0,0 +1,47 @@
+"""
+Keyset Pagination
+
+Pages are addressed by the sort key of the last row already returned, so
+fetching page N costs the same as page 1: the database seeks into the
+(sort_key, id) index instead of skipping N * page_size rows. The cursor handed
+to clients is that key, JSON-encoded and base64url'd; treat it as opaque.
+"""
+
+import base64
+import binascii
+import json
+from typing import List, Optional, Sequence
+
+# Listing endpoints accept ?limit= up to this many rows
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row: dict, columns: Sequence[str]) -> str:
+    raw = json.dumps([row[column] for column in columns], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence[str]) -> List:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def next_cursor(rows: List[dict], limit: int, columns: Sequence[str]) -> Optional[str]:
+    """
+    Callers fetch limit + 1 rows; an extra row means there is another page.
+    Trims `rows` to the page in place.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(rows[-1], columns)
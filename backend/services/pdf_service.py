@@ -1,80 +1,293 @@
 import os
 import uuid
+import asyncio
+import hashlib
+import logging
+import threading
 from typing import Tuple, Optional
 from fastapi import HTTPException, UploadFile
-from clients.supabase_client import supabase
 from dotenv import load_dotenv
-from services.processor import process_pdf
+from services.repositories import document_repository, FileStorage
+from services.processor import process_pdf, process_pdf_bytes
+from services.checkpoints import checkpoint_store
+from services.jobs import job_manager, JobQueueFull
+from clients.registry import get_vector_store
+from services.answer_cache import answer_cache
+from services.telemetry import log_fields
 
 
 load_dotenv()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+# How long an ingestion worker waits for its database update on the event loop
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
 class PDFService:
     def __init__(self):
         self.bucket_name = os.getenv("SUPABASE_BUCKET_NAME")
-        
+        self.storage = FileStorage(self.bucket_name)
+        # Loop the async database client lives on; ingestion workers hop back onto it
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # content_hash -> upload info for PDFs whose ingestion job is still running
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
     async def upload_pdf(self, file: UploadFile, user_id: Optional[str] = None) -> dict:
         """
-        Upload a PDF file to Supabase storage and return file info with signed URL
+        Upload a PDF file to Supabase storage, queue it for background ingestion
+        and return file info with signed URL and the ingestion job id.
+        PDFs whose content was already indexed reuse the existing namespace.
         """
         try:
             # Validate file
             if not file.filename.endswith(".pdf"):
                 raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-            # Generate unique name
-            file_id = str(uuid.uuid4())
-            filename = f"{file_id}_{file.filename}"
+            # Read content, hashing it as it comes in
+            content, content_hash = await self._read_and_hash(file)
+            self._loop = asyncio.get_running_loop()
 
-            # Read content
-            content = await file.read()
-            
-            # Upload to Supabase
-            upload_response = supabase.storage.from_(self.bucket_name).upload(
-                path=filename,
-                file=content,
-                file_options={"content-type": file.content_type}
-            )
+            while True:
+                # ✅ Claim the hash (and a queue slot) before any await, so an
+                # identical upload arriving meanwhile attaches instead of ingesting twice
+                claim, in_flight = self._claim(content_hash, file.filename)
+                if claim is None:
+                    job = await asyncio.shield(in_flight["job"])
+                    if job is None:
+                        continue  # That upload failed and was rolled back; take over
+                    duplicate = {**in_flight, "pages_count": None, "job_id": job["job_id"], "status": job["status"]}
+                    return await self._attach_duplicate(duplicate, content_hash, user_id)
+                return await self._ingest_new(claim, file, content, content_hash, user_id)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-            if hasattr(upload_response, 'error') and upload_response.error:
-                raise HTTPException(status_code=500, detail=f"Supabase upload failed: {upload_response.error}")
+    def _claim(self, content_hash: str, original_name: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """
+        Either (claim, None): this upload registered the hash as in flight, or
+        (None, entry): another upload of the same bytes already did.
+        """
+        with self._in_flight_lock:
+            in_flight = self._in_flight.get(content_hash)
+            if in_flight is not None:
+                return None, in_flight
+            file_id = str(uuid.uuid4())
+            claim = {
+                "file_id": file_id,
+                "filename": f"{file_id}_{original_name}",
+                # Resolves to the job record, or None if this upload fails
+                "job": self._loop.create_future(),
+                "reserved": True,
+            }
+            try:
+                job_manager.reserve()
+            except JobQueueFull:
+                # Still fine if the content turns out to be indexed already
+                claim["reserved"] = False
+            self._in_flight[content_hash] = claim
+            return claim, None
 
-            # Create signed URL (valid for 24 hrs)
-            signed_url_res = supabase.storage.from_(self.bucket_name).create_signed_url(filename, 86400)
+    async def _ingest_new(self, claim: dict, file: UploadFile, content: bytes, content_hash: str, user_id: Optional[str]) -> dict:
+        file_id, filename = claim["file_id"], claim["filename"]
+        uploaded = False
+        document = None
+        job = None
+        try:
+            # ✅ Same bytes already indexed? Attach to that namespace
+            existing = await document_repository.find_indexed(content_hash)
+            if existing:
+                return await self._attach_duplicate({**existing, "job_id": None, "status": "done"}, content_hash, user_id)
+            if not claim["reserved"]:
+                raise HTTPException(status_code=503, detail="Too many PDFs are being processed, please retry shortly")
 
-            if hasattr(signed_url_res, 'error') and signed_url_res.error:
-                raise HTTPException(status_code=500, detail=f"Failed to generate signed URL: {signed_url_res.error}")
+            # Upload to Supabase
+            await self.storage.upload(filename, content, file.content_type)
+            uploaded = True
 
-            # Extract the signed URL from the response
-            signed_url = signed_url_res.signed_url if hasattr(signed_url_res, 'signed_url') else signed_url_res.get("signedUrl")
+            signed_url = await self._create_signed_url(filename)
 
-            # ✅ Auto trigger processing
-            processed = process_pdf(file_id, filename, signed_url)
-            
             data = {
                 "file_id": file_id,
                 "filename": filename,
-                "pages_count": int(processed["pages_extracted"]),
+                "pages_count": None,  # Filled in once the ingestion job finishes
+                "content_hash": content_hash,
                 "user_id": user_id  # Add user_id to document
-            }            
-            
+            }
+
             # ✅ Safe insert with full control
-            response = supabase.table("documents").insert(data).execute()
-            if hasattr(response, 'error') and response.error:
-                raise HTTPException(status_code=500, detail=f"Database insert failed: {response.error}")
-            
-            # Get the inserted document ID
-            document_id = response.data[0]['id'] if response.data else None
-            
+            document = await document_repository.create(data)
+
+            # ✅ Queue processing on the ingestion worker pool, straight from the uploaded bytes
+            job = job_manager.submit(
+                lambda update: process_pdf_bytes(file_id, filename, content, on_status=update, on_progress=update),
+                file_id=file_id,
+                on_done=lambda processed: self._mark_processed(file_id, processed),
+                on_error=lambda error: self._forget_in_flight(content_hash),
+                reserved=True,
+            )
+
             return {
                 "file_id": file_id,
-                "document_id": document_id,  # This is the actual database ID
+                "document_id": document["id"],  # This is the actual database ID
                 "filename": filename,
                 "signed_url": signed_url,
-                "processing_result": processed
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "deduplicated": False
+            }
+
+        except BaseException:
+            if job is None:
+                await self._roll_back_upload(filename if uploaded else None, document)
+            raise
+
+        finally:
+            if job is None:
+                if claim["reserved"]:
+                    job_manager.release()
+                self._forget_in_flight(content_hash)
+            claim["job"].set_result(job)
+
+    async def _roll_back_upload(self, filename: Optional[str], document: Optional[dict]):
+        # Don't leave a documents row or stored object behind for an upload that was never queued
+        try:
+            if document is not None:
+                await document_repository.delete(document["id"])
+            if filename is not None:
+                await self.storage.remove([filename])
+        except Exception:
+            logger.exception("Failed to roll back upload", extra=log_fields(filename=filename))
+
+    async def reprocess_pdf(self, file_id: str, restart: bool = False) -> dict:
+        """
+        Re-run ingestion for a PDF that is already in Supabase storage.
+        An ingestion that failed part-way resumes from its last committed
+        segment unless `restart` is set.
+        """
+        try:
+            document = await document_repository.find_by_file_id(file_id, columns="id, filename")
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+
+            self._loop = asyncio.get_running_loop()
+            if restart:
+                checkpoint_store.delete(file_id)
+            filename = document["filename"]
+            signed_url = await self._create_signed_url(filename)
+
+            try:
+                job = job_manager.submit(
+                    lambda update: process_pdf(file_id, filename, signed_url, on_status=update, on_progress=update),
+                    file_id=file_id,
+                    on_done=lambda processed: self._mark_processed(file_id, processed),
+                )
+            except JobQueueFull as e:
+                raise HTTPException(status_code=503, detail=str(e))
+
+            return {
+                "file_id": file_id,
+                "document_id": document["id"],
+                "filename": filename,
+                "job_id": job["job_id"],
+                "status": job["status"]
             }
 
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+
+    async def delete_document(self, document_id: str) -> dict:
+        """
+        Delete a documents row. The vectors and stored file are shared by every
+        upload of the same content, so they are only removed with the last reference.
+        """
+        try:
+            document = await document_repository.get(document_id, columns="id, file_id, filename")
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+
+            await document_repository.delete(document_id)
+
+            remaining = await self.namespace_references(document["file_id"])
+            if remaining == 0:
+                await asyncio.to_thread(get_vector_store().delete_namespace, document["file_id"])
+                await self.storage.remove([document["filename"]])
+                checkpoint_store.delete(document["file_id"])
+
+            return {"message": "Document deleted successfully", "remaining_references": remaining}
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def namespace_references(self, file_id: str) -> int:
+        """
+        Number of documents rows that share the vector namespace of `file_id`
+        """
+        return await document_repository.count_for_file(file_id)
+
+    async def _read_and_hash(self, file: UploadFile) -> Tuple[bytes, str]:
+        hasher = hashlib.sha256()
+        parts = []
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            parts.append(chunk)
+        return b"".join(parts), hasher.hexdigest()
+
+    async def _attach_duplicate(self, existing: dict, content_hash: str, user_id: Optional[str]) -> dict:
+        data = {
+            "file_id": existing["file_id"],
+            "filename": existing["filename"],
+            "pages_count": existing["pages_count"],
+            "content_hash": content_hash,
+            "user_id": user_id
+        }
+        document, signed_url = await asyncio.gather(
+            document_repository.create(data),
+            self._create_signed_url(existing["filename"])
+        )
+
+        return {
+            "file_id": existing["file_id"],
+            "document_id": document["id"],
+            "filename": existing["filename"],
+            "signed_url": signed_url,
+            "job_id": existing["job_id"],
+            "status": existing["status"],
+            "deduplicated": True
+        }
+
+    def _forget_in_flight(self, content_hash: str):
+        with self._in_flight_lock:
+            self._in_flight.pop(content_hash, None)
+
+    async def _create_signed_url(self, filename: str) -> str:
+        # Create signed URL (valid for 24 hrs)
+        try:
+            return await self.storage.signed_url(filename, 86400)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to generate signed URL: {e}")
+
+    def _mark_processed(self, file_id: str, processed: dict):
+        """
+        Store the page count on every documents row sharing this namespace and
+        drop its cached answers once ingestion has finished.
+        Runs on the ingestion worker thread, so the update is handed to the event loop.
+        """
+        update = document_repository.set_pages_count(file_id, int(processed["pages_extracted"]))
+        asyncio.run_coroutine_threadsafe(update, self._loop).result(timeout=JOB_CALLBACK_TIMEOUT)
+        # Answers cached before a re-ingestion may no longer match the index
+        answer_cache.invalidate(file_id)
+        with self._in_flight_lock:
+            for content_hash, info in list(self._in_flight.items()):
+                if info["file_id"] == file_id:
+                    del self._in_flight[content_hash]
@@ -0,0 +1,72 @@
+"""
+Producer/consumer helpers for the ingestion pipeline.
+
+Each stage runs in its own thread and hands items to the next stage through
+a bounded queue, so extraction, encoding and upserting overlap while only a
+few items are buffered between stages at any time.
+"""
+
+import contextvars
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def background(iterable: Iterable[T], maxsize: int = 2, name: str = "pipeline-stage") -> Iterator[T]:
+    """
+    Iterates `iterable` on a background thread and yields its items.
+    At most `maxsize` items are buffered; exceptions raised by the producer are
+    re-raised in the consumer. Closing the generator stops the producer.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_StageError(e))
+            return
+        finally:
+            # Propagate shutdown to upstream stages
+            if hasattr(iterator, "close"):
+                iterator.close()
+        put(_DONE)
+
+    # The stage runs in the caller's context, so its logs keep the request id
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(produce,), name=name, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
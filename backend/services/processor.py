@@ -1,28 +1,114 @@
 from services.downloader import download_pdf_from_url
-from services.extractor import extract_text_from_pdf
+from services.extractor import count_pages, extract_pages, PDFSource
+import logging
 import os
 import tempfile
+from typing import Callable, Optional
+from services.checkpoints import checkpoint_store
 from services.embedder import embed_and_store
+from services.metrics import span
+from services.telemetry import log_fields
 
-def process_pdf(file_id: str, filename: str, signed_url: str):
-    # Use the system's temporary directory (works on Windows, Linux, macOS)
-    temp_dir = tempfile.gettempdir()
-    local_path = os.path.join(temp_dir, filename)
+logger = logging.getLogger(__name__)
 
-    # Download
-    download_pdf_from_url(signed_url, local_path)
 
-    # Extract text
-    extracted_pages = extract_text_from_pdf(local_path)
-    embedding_summary = embed_and_store(extracted_pages, file_id)
+def process_pdf_bytes(
+    file_id: str,
+    filename: str,
+    content: bytes,
+    on_status: Optional[Callable[[str], None]] = None,
+    on_progress: Optional[Callable[..., None]] = None,
+):
+    """
+    Ingest an uploaded PDF straight from its in-memory buffer.
+    Used by the upload flow, so the bytes never round-trip through storage.
+    """
+    if on_status:
+        on_status("extracting")
 
-    # Cleanup
-    if os.path.exists(local_path):
-        os.remove(local_path)
+    return _extract_and_embed(file_id, filename, content, on_status, on_progress)
+
+
+def process_pdf(
+    file_id: str,
+    filename: str,
+    signed_url: str,
+    on_status: Optional[Callable[[str], None]] = None,
+    on_progress: Optional[Callable[..., None]] = None,
+):
+    """
+    Re-process a PDF that already lives in Supabase storage by downloading it
+    from a signed URL. Resumes from the file's checkpoint if an earlier
+    ingestion stopped part-way.
+    """
+    # A unique file in the system's temporary directory, so concurrent jobs never collide
+    fd, local_path = tempfile.mkstemp(prefix=f"{file_id}-", suffix=".pdf")
+    os.close(fd)
+
+    try:
+        if on_status:
+            on_status("extracting")
+
+        # Download
+        with span("download"):
+            download_pdf_from_url(signed_url, local_path)
+
+        return _extract_and_embed(file_id, filename, local_path, on_status, on_progress)
+
+    finally:
+        # Cleanup, also when the download or ingestion failed
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+
+def _extract_and_embed(
+    file_id: str,
+    filename: str,
+    source: PDFSource,
+    on_status: Optional[Callable[[str], None]],
+    on_progress: Optional[Callable[..., None]],
+):
+    page_count = count_pages(source)
+    checkpoint = checkpoint_store.load(file_id)
+    if checkpoint and checkpoint.get("page_count") != page_count:
+        # Not the same document any more
+        checkpoint = None
+    pages_done = checkpoint["pages_done"] if checkpoint else 0
+    if pages_done:
+        logger.info("Resuming ingestion", extra=log_fields(file_id=file_id, pages_done=pages_done, page_count=page_count))
+
+    if on_progress:
+        on_progress(
+            page_count=page_count,
+            resumed_from_page=pages_done,
+            pages_committed=pages_done,
+            vectors_stored=checkpoint["vectors_stored"] if checkpoint else 0,
+        )
+
+    def commit(segment: dict):
+        checkpoint_store.save(file_id, {**segment, "page_count": page_count})
+        if on_progress:
+            on_progress(pages_committed=segment["pages_done"], vectors_stored=segment["vectors_stored"])
+
+    # Extract text, streaming pages into the embedder as they are parsed.
+    # A resumed run starts one page early so a cross-page chunk can carry its tail.
+    extracted_pages = extract_pages(source, start=max(pages_done - 1, 0))
+    embedding_summary = embed_and_store(
+        extracted_pages,
+        file_id,
+        on_status=on_status,
+        resume=checkpoint,
+        on_commit=commit,
+        on_progress=on_progress,
+    )
+    checkpoint_store.delete(file_id)
+    if on_progress:
+        on_progress(pages_committed=page_count, vectors_stored=embedding_summary["vectors_stored"])
 
     return {
         "file_id": file_id,
         "filename": filename,
-        "pages_extracted": len(extracted_pages),
-        "vectors_stored": embedding_summary["vectors_stored"]
+        "pages_extracted": embedding_summary["pages_processed"],
+        "vectors_stored": embedding_summary["vectors_stored"],
+        "resumed_from_page": pages_done
     }
@@ -0,0 +1,149 @@
+"""
+Query Router
+
+Decides, before any retrieval work, how a question should be answered:
+
+- document_specific: retrieve context and answer from it
+- general_knowledge: answer from the LLM alone, no embedding or vector query
+- hybrid: not sure, so retrieval runs concurrently with prompt preparation
+  and the answer uses whatever context arrives in time
+
+The indicator phrases are matched with one compiled regex. An optional
+embedding-centroid classifier (ROUTER_CENTROIDS=true) can settle questions
+the phrases don't cover.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from clients.registry import get_embedding_server
+from services.embedding_server import QUERY
+from services.metrics import metrics_registry
+
+# Document-specific indicators
+DOC_INDICATORS = [
+    "in this document", "pdf", "in the pdf", "according to this", "in the file",
+    "what does this say", "summarize this", "what is this about",
+    "in the text", "the document says", "this paper", "this report", "document"
+]
+
+# General knowledge indicators
+GENERAL_INDICATORS = [
+    "what is", "how does", "why does", "explain", "define",
+    "what are the benefits", "what are the advantages", "tell me about",
+    "how to", "what causes", "what happens when"
+]
+
+ROUTER_CENTROIDS = os.getenv("ROUTER_CENTROIDS", "false").lower() in ("1", "true", "yes")
+# Minimum similarity gap between the two centroids before the classifier commits
+ROUTER_CENTROID_MARGIN = float(os.getenv("ROUTER_CENTROID_MARGIN", "0.05"))
+
+
+def _alternation(phrases) -> str:
+    # Longest first, so "what is this about" wins over "what is" at the same position
+    return "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+
+
+_INDICATOR_PATTERN = re.compile(f"(?P<document_specific>{_alternation(DOC_INDICATORS)})|(?P<general_knowledge>{_alternation(GENERAL_INDICATORS)})")
+
+# Exemplar questions for the centroid classifier
+_CENTROID_EXAMPLES = {
+    "document_specific": [
+        "What are the key findings of this study?",
+        "Who are the parties to the agreement?",
+        "List the main recommendations.",
+        "What does section 3 cover?",
+        "What deadlines are mentioned?",
+        "Give me an overview of the results.",
+    ],
+    "general_knowledge": [
+        "What is machine learning?",
+        "How does photosynthesis work?",
+        "Who invented the telephone?",
+        "What is the capital of France?",
+        "Write a haiku about autumn.",
+        "How do I reverse a list in Python?",
+    ],
+}
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    certain: bool
+    source: str  # "indicator", "centroid" or "default"
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid classifier over normalized question embeddings.
+    Centroids are built lazily from the exemplars on first use.
+    """
+
+    def __init__(self, examples: dict = _CENTROID_EXAMPLES, margin: float = ROUTER_CENTROID_MARGIN):
+        self.examples = examples
+        self.margin = margin
+        self.labels = list(examples)
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> np.ndarray:
+        server = get_embedding_server()
+        centroids = []
+        for label in self.labels:
+            embeddings = server.encode(self.examples[label], QUERY)
+            centroid = embeddings.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        return np.stack(centroids)
+
+    def classify(self, question_vector: np.ndarray) -> Optional[str]:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._centroids = self._build()
+        vector = np.asarray(question_vector, dtype=np.float32)
+        scores = self._centroids @ (vector / np.linalg.norm(vector))
+        order = np.argsort(-scores)
+        if scores[order[0]] - scores[order[1]] < self.margin:
+            return None
+        return self.labels[int(order[0])]
+
+
+centroid_classifier = CentroidClassifier() if ROUTER_CENTROIDS else None
+
+
+def route_question(question: str) -> RouteDecision:
+    """
+    Route on indicator phrases alone; document indicators anywhere in the
+    question take precedence over general ones.
+    """
+    route = None
+    for match in _INDICATOR_PATTERN.finditer(question.lower()):
+        route = match.lastgroup
+        if route == "document_specific":
+            break
+    if route:
+        return RouteDecision(route, certain=True, source="indicator")
+    return RouteDecision("hybrid", certain=False, source="default")
+
+
+def refine_route(decision: RouteDecision, question_vector: np.ndarray) -> RouteDecision:
+    """
+    Settle an uncertain decision with the centroid classifier, if enabled.
+    """
+    if decision.certain or centroid_classifier is None:
+        return decision
+    label = centroid_classifier.classify(question_vector)
+    if label is None:
+        return decision
+    return RouteDecision(label, certain=True, source="centroid")
+
+
+route_latency = metrics_registry.histogram(
+    "question_duration_seconds", "Time to answer a question, by route.", ["route"]
+)
@@ -0,0 +1,172 @@
+"""
+Data Access Layer
+
+Async repositories for the chats, messages and documents tables and the PDF
+storage bucket. They all go through the pooled client from the registry
+(`clients.supabase_client.AsyncSupabase`), so route handlers never block the
+event loop on a database round trip. Swap in `clients.fakes.FakeSupabase`
+with `registry.set("supabase", ...)` for tests and offline runs.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from clients.registry import get_supabase
+from clients.supabase_client import DatabaseError
+from services.pagination import decode_cursor, next_cursor
+
+# Columns the list views render (plus the keyset column)
+CHAT_LIST_COLUMNS = "id, title, created_at, updated_at"
+MESSAGE_LIST_COLUMNS = "id, content, sender, created_at"
+
+# SQLSTATE raised by the database functions when the target row is missing
+NO_DATA_FOUND = "P0002"
+
+
+class NotFoundError(Exception):
+    pass
+
+
+class _Repository:
+    table: str = ""
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    async def _first(self, columns: str, filters) -> Optional[dict]:
+        rows, _ = await self.db.select(self.table, columns, filters=filters, limit=1)
+        return rows[0] if rows else None
+
+    async def _page(self, columns: str, filters, order, limit: int, cursor: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+        """
+        One keyset page ordered by `order`, which must end in a unique column.
+        Returns (rows, next_cursor).
+        """
+        keys = [column for column, _ in order]
+        after = decode_cursor(cursor, keys) if cursor else None
+        rows, _ = await self.db.select(self.table, columns, filters=filters, order=order, limit=limit + 1, after=after)
+        return rows, next_cursor(rows, limit, keys)
+
+    async def _insert_one(self, data: dict) -> dict:
+        rows = await self.db.insert(self.table, [data])
+        if not rows:
+            raise RuntimeError(f"No data returned from {self.table} insert")
+        return rows[0]
+
+
+class ChatRepository(_Repository):
+    table = "chats"
+    order = [("updated_at", True), ("id", True)]
+
+    async def create(self, data: dict) -> dict:
+        return await self._insert_one(data)
+
+    async def get(self, chat_id: str, columns: str = "*") -> Optional[dict]:
+        return await self._first(columns, [("id", "eq", chat_id)])
+
+    async def list_page(self, limit: int, cursor: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Chats newest activity first, optionally only one user's.
+        """
+        filters = [("user_id", "eq", user_id)] if user_id else []
+        return await self._page(CHAT_LIST_COLUMNS, filters, self.order, limit, cursor)
+
+    async def touch_many(self, updated_at: Dict[str, str]):
+        """
+        Bump updated_at for many chats in one round trip (see `touch_chats` in SETUP_GUIDE.md).
+        """
+        chat_ids = list(updated_at)
+        await self.db.rpc("touch_chats", {"p_chat_ids": chat_ids, "p_updated_at": [updated_at[c] for c in chat_ids]})
+
+    async def delete(self, chat_id: str):
+        # Messages go with it (ON DELETE CASCADE)
+        await self.db.delete(self.table, [("id", "eq", chat_id)])
+
+
+class MessageRepository(_Repository):
+    table = "messages"
+    order = [("created_at", True), ("id", True)]
+
+    async def append(self, chat_id: str, content: str, sender: str, touch: bool = True) -> dict:
+        """
+        Check the chat exists, insert the message and (unless `touch` is false)
+        bump the chat's updated_at, atomically and in one round trip through
+        the `append_message` database function.
+        """
+        try:
+            return await self.db.rpc("append_message", {
+                "p_chat_id": chat_id,
+                "p_content": content,
+                "p_sender": sender,
+                "p_touch": touch,
+            })
+        except DatabaseError as e:
+            if e.code == NO_DATA_FOUND:
+                raise NotFoundError("Chat not found") from e
+            raise
+
+    async def list_page(self, chat_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        The most recent messages of a chat in chronological order; `next_cursor`
+        pages backwards to older messages.
+        """
+        rows, cursor = await self._page(MESSAGE_LIST_COLUMNS, [("chat_id", "eq", chat_id)], self.order, limit, cursor)
+        rows.reverse()
+        return rows, cursor
+
+
+class DocumentRepository(_Repository):
+    table = "documents"
+
+    async def create(self, data: dict) -> dict:
+        return await self._insert_one(data)
+
+    async def get(self, document_id: str, columns: str = "*") -> Optional[dict]:
+        return await self._first(columns, [("id", "eq", document_id)])
+
+    async def find_by_file_id(self, file_id: str, columns: str = "*") -> Optional[dict]:
+        return await self._first(columns, [("file_id", "eq", file_id)])
+
+    async def find_indexed(self, content_hash: str) -> Optional[dict]:
+        """
+        A row with this content whose ingestion finished (only those have a page count).
+        """
+        return await self._first(
+            "file_id, filename, pages_count",
+            [("content_hash", "eq", content_hash), ("pages_count", "not.is", "null")],
+        )
+
+    async def count_for_file(self, file_id: str) -> int:
+        _, total = await self.db.select(self.table, "id", filters=[("file_id", "eq", file_id)], limit=0, count=True)
+        return total or 0
+
+    async def set_pages_count(self, file_id: str, pages_count: int):
+        await self.db.update(self.table, {"pages_count": pages_count}, [("file_id", "eq", file_id)])
+
+    async def delete(self, document_id: str):
+        await self.db.delete(self.table, [("id", "eq", document_id)])
+
+
+class FileStorage:
+    """
+    The Supabase Storage bucket holding the uploaded PDFs.
+    """
+
+    def __init__(self, bucket: Optional[str] = None):
+        self.bucket = bucket or os.getenv("SUPABASE_BUCKET_NAME")
+
+    async def upload(self, path: str, content: bytes, content_type: Optional[str] = None):
+        await get_supabase().upload(self.bucket, path, content, content_type)
+
+    async def signed_url(self, path: str, expires_in: int = 86400) -> str:
+        return await get_supabase().create_signed_url(self.bucket, path, expires_in)
+
+    async def remove(self, paths: List[str]):
+        await get_supabase().remove(self.bucket, paths)
+
+
+chat_repository = ChatRepository()
+message_repository = MessageRepository()
+document_repository = DocumentRepository()
+file_storage = FileStorage()
@@ -0,0 +1,139 @@
+"""
+Server-Sent Event framing for streamed answers.
+
+LLM deltas are a few characters each; framing every delta as its own
+`data:` event costs ~20 bytes of framing, a json.dumps and a socket write per
+delta. `answer_events` sends the first delta at once (time to first token is
+unchanged) and then coalesces the following deltas into one event per
+SSE_FLUSH_INTERVAL_MS window, or sooner once SSE_FLUSH_BYTES of text are
+buffered. While nothing arrives (retrieval, a slow first token) a comment
+line every SSE_HEARTBEAT seconds keeps proxies from closing the connection.
+
+With SSE_GZIP enabled and a client that accepts it, `gzip_frames` compresses
+the stream with a sync flush after every event, so each event can still be
+decoded as soon as it arrives.
+"""
+
+import asyncio
+import json
+import os
+import zlib
+from typing import AsyncIterator, List, Optional
+
+SSE_FLUSH_INTERVAL_MS = float(os.getenv("SSE_FLUSH_INTERVAL_MS", "50"))
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", "2048"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_GZIP = os.getenv("SSE_GZIP", "false").lower() in ("1", "true", "yes")
+
+HEARTBEAT_FRAME = ": keep-alive\n\n"
+GZIP_LEVEL = 6
+
+
+def event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def answer_events(
+    chunks: AsyncIterator[str],
+    flush_interval_ms: float = SSE_FLUSH_INTERVAL_MS,
+    flush_bytes: int = SSE_FLUSH_BYTES,
+    heartbeat: float = SSE_HEARTBEAT,
+) -> AsyncIterator[str]:
+    """
+    SSE frames for an answer stream: `{"chunk": ...}` events with coalesced
+    text, heartbeat comments, an `{"error": ...}` event if the stream fails and
+    a final `{"done": true}` event.
+    """
+    loop = asyncio.get_running_loop()
+    buffer: List[str] = []
+    buffered = 0
+    finished = False
+    error: Optional[Exception] = None
+    idle = False  # The writer is waiting for any text, not for a full buffer
+    waiter: Optional[asyncio.Future] = None
+
+    def wake():
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def pause(timeout: float):
+        # Until woken or `timeout`; a bare future and timer are much cheaper
+        # than asyncio.wait_for, which starts and cancels a task every time
+        nonlocal waiter
+        waiter = loop.create_future()
+        timer = loop.call_later(timeout, wake)
+        try:
+            await waiter
+        finally:
+            timer.cancel()
+            waiter = None
+
+    # A reader task drains the stream into the buffer, so the writer below only
+    # wakes once per event instead of once per delta
+    async def read():
+        nonlocal buffered, finished, error
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    buffer.append(chunk)
+                    buffered += len(chunk.encode())
+                    if idle or buffered >= flush_bytes:
+                        wake()
+        except Exception as e:
+            error = e
+        finally:
+            finished = True
+            wake()
+
+    def flush() -> str:
+        nonlocal buffered
+        frame = event({"chunk": "".join(buffer)})
+        buffer.clear()
+        buffered = 0
+        return frame
+
+    reader = asyncio.ensure_future(read())
+    first = True
+    try:
+        while True:
+            if not buffer and not finished:
+                idle = True
+                await pause(heartbeat)
+                idle = False
+                if not buffer and not finished:
+                    yield HEARTBEAT_FRAME
+                    continue
+
+            # The first text goes out at once; later text waits for the window
+            if buffer and not first and not finished and buffered < flush_bytes:
+                await pause(flush_interval_ms / 1000)
+            if buffer:
+                first = False
+                yield flush()
+            if finished and not buffer:
+                break
+
+        if error is not None:
+            yield event({"error": str(error)})
+    finally:
+        reader.cancel()
+
+    yield event({"done": True})
+
+
+async def gzip_frames(frames: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """
+    Gzip-encode a frame stream, flushing the compressor after every frame.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for frame in frames:
+        yield compressor.compress(frame.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
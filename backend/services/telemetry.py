@@ -0,0 +1,153 @@
+"""
+Structured logging with request ids.
+
+Every HTTP request gets an id (the incoming X-Request-ID header, or a fresh
+one) that is kept in a context variable, echoed back in the response headers
+and attached to every log record emitted while the request is handled,
+including from ingestion jobs and pipeline threads started by it.
+
+LOG_FORMAT=json (default) writes one JSON object per line; LOG_FORMAT=text
+writes a plain line with the structured fields appended as key=value.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Top-level packages whose loggers get the structured handler
+LOGGER_NAMES = ("main", "routes", "services", "clients")
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def log_fields(**fields) -> dict:
+    """
+    `extra=` argument that attaches structured fields to a log record.
+    """
+    return {"fields": fields}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _record_fields(record: logging.LogRecord) -> dict:
+    fields = {}
+    request_id = getattr(record, "request_id", None)
+    if request_id:
+        fields["request_id"] = request_id
+    fields.update(getattr(record, "fields", None) or {})
+    return fields
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_record_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Attach the structured handler to the app's loggers. Safe to call more than once.
+    """
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    for name in LOGGER_NAMES:
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.setLevel(level)
+        # uvicorn configures the root logger; don't log every line twice
+        logger.propagate = False
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that assigns the request id and records per-route HTTP
+    metrics. Plain ASGI rather than BaseHTTPMiddleware so streaming responses
+    pass through untouched.
+    """
+
+    def __init__(self, app):
+        from services.metrics import metrics_registry
+
+        self.app = app
+        self.requests = metrics_registry.counter(
+            "http_requests_total", "HTTP requests by method, route template and status.", ["method", "route", "status"]
+        )
+        self.duration = metrics_registry.histogram(
+            "http_request_duration_seconds", "HTTP request duration until the response body completed.", ["method", "route"]
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = new_request_id()
+
+        token = request_id_var.set(request_id)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            # Label by route template, not the raw path, to keep the series bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.requests.inc(method=scope["method"], route=route, status=status)
+            self.duration.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            request_id_var.reset(token)
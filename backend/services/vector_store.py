@@ -0,0 +1,302 @@
+"""
+Vector Store Backends
+
+Ingestion and retrieval talk to a VectorStore instead of a Pinecone index:
+
+- PineconeVectorStore: the hosted Pinecone index (default).
+- LocalVectorStore: one directory per namespace holding the embeddings as a
+  memory-mapped float32 matrix plus a JSON-lines metadata file. Top-k is a
+  single matrix-vector product, so single-document namespaces answer in well
+  under a millisecond and everything works without network access.
+
+Select the backend with VECTOR_STORE=pinecone|local.
+"""
+
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+from services.cache import LRUCache
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone").lower()
+# `or`, so an empty value in .env falls back to the default too
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "vector_store")
+LOCAL_VECTOR_STORE_CACHE = int(os.getenv("LOCAL_VECTOR_STORE_CACHE", "64"))
+
+
+class VectorStore:
+    """
+    Interface shared by the backends. Vectors use the Pinecone shape:
+    {"id": str, "values": List[float], "metadata": dict}. Matches are
+    {"id": str, "score": float, "metadata": dict}, best first.
+    """
+
+    def upsert(self, vectors: List[dict], namespace: str):
+        raise NotImplementedError
+
+    def query(self, vector: np.ndarray, top_k: int, namespace: str) -> List[dict]:
+        raise NotImplementedError
+
+    def delete_namespace(self, namespace: str):
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, vectors: List[dict], namespace: str):
+        return self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def query(self, vector: np.ndarray, top_k: int, namespace: str) -> List[dict]:
+        response = self.index.query(
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True,
+        )
+        return [
+            {"id": _field(match, "id"), "score": _field(match, "score"), "metadata": _field(match, "metadata") or {}}
+            for match in _field(response, "matches") or []
+        ]
+
+    def delete_namespace(self, namespace: str):
+        self.index.delete(delete_all=True, namespace=namespace)
+
+
+class _LocalNamespace:
+    """
+    One namespace on disk: vectors.f32 (row-major float32, L2-normalized),
+    meta.jsonl (one {"id", "row", "metadata"} line per write, later lines win)
+    and info.json ({"dim": N}). Callers hold the namespace's path lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dim: Optional[int] = None
+        self.ids: Dict[str, int] = {}
+        self.row_ids: List[str] = []
+        self.metadata: List[dict] = []
+        self.matrix: Optional[np.ndarray] = None
+        self._loaded_size = -1
+        self.reload()
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.path, "meta.jsonl")
+
+    @property
+    def info_path(self) -> str:
+        return os.path.join(self.path, "info.json")
+
+    def reload(self):
+        self.ids, self.row_ids, self.metadata, self.matrix = {}, [], [], None
+        self.dim = None
+        if not os.path.exists(self.info_path):
+            self._loaded_size = 0
+            return
+
+        with open(self.info_path) as f:
+            self.dim = json.load(f)["dim"]
+        with open(self.meta_path) as f:
+            for line in f:
+                entry = json.loads(line)
+                row = entry["row"]
+                if row == len(self.metadata):
+                    self.metadata.append(entry["metadata"])
+                    self.row_ids.append(entry["id"])
+                else:
+                    self.metadata[row] = entry["metadata"]
+                self.ids[entry["id"]] = row
+        self._map()
+
+    def _map(self):
+        rows = len(self.metadata)
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+        self._loaded_size = self._meta_size()
+
+    def _meta_size(self) -> int:
+        return os.path.getsize(self.meta_path) if os.path.exists(self.meta_path) else 0
+
+    def is_stale(self) -> bool:
+        # Another process (e.g. a different uvicorn worker) may have written to it;
+        # every write appends to meta.jsonl
+        return self._meta_size() != self._loaded_size
+
+    def upsert(self, vectors: List[dict]):
+        values = _normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        os.makedirs(self.path, exist_ok=True)
+        if self.dim is None:
+            self.dim = values.shape[1]
+            with open(self.info_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+        if values.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension {values.shape[1]} does not match namespace dimension {self.dim}")
+
+        appended, overwritten, meta_lines = [], [], []
+        for i, vector in enumerate(vectors):
+            row = self.ids.get(vector["id"])
+            if row is None:
+                row = len(self.metadata)
+                self.ids[vector["id"]] = row
+                self.row_ids.append(vector["id"])
+                self.metadata.append(vector.get("metadata", {}))
+                appended.append(i)
+            else:
+                self.metadata[row] = vector.get("metadata", {})
+                overwritten.append((row, i))
+            meta_lines.append(json.dumps({"id": vector["id"], "row": row, "metadata": self.metadata[row]}))
+
+        # Release the read-only map before the file changes
+        self.matrix = None
+        if appended:
+            with open(self.vectors_path, "ab") as f:
+                f.write(values[appended].tobytes())
+        if overwritten:
+            with open(self.vectors_path, "r+b") as f:
+                for row, i in overwritten:
+                    f.seek(row * self.dim * 4)
+                    f.write(values[i].tobytes())
+        with open(self.meta_path, "a") as f:
+            f.write("\n".join(meta_lines) + "\n")
+        self._map()
+
+    def query(self, vector: np.ndarray, top_k: int) -> List[dict]:
+        if self.matrix is None:
+            return []
+        query = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = self.matrix @ query
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": self.row_ids[row], "score": float(scores[row]), "metadata": self.metadata[row]}
+            for row in top
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, root: str = LOCAL_VECTOR_STORE_DIR, cache_size: int = LOCAL_VECTOR_STORE_CACHE):
+        self.root = root
+        self._namespaces = LRUCache(maxsize=cache_size, name="local_namespaces")
+        # One lock per namespace directory, never evicted: an evicted namespace
+        # can still be mid-write while a fresh object for the same directory is
+        # created, and both must serialize on the same lock
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _namespace(self, namespace: str) -> _LocalNamespace:
+        with self._lock:
+            return self._namespaces.get_or_create(namespace, lambda: _LocalNamespace(self._path(namespace)))
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_default")
+
+    @contextlib.contextmanager
+    def _locked(self, namespace: str, exclusive: bool):
+        """
+        Hold the namespace's thread lock and, across processes (uvicorn
+        workers), a flock on its lock file: exclusive for writes, shared for reads.
+        """
+        path = self._path(namespace)
+        with self._lock:
+            lock = self._path_locks.setdefault(path, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def upsert(self, vectors: List[dict], namespace: str):
+        if not vectors:
+            return {"upserted_count": 0}
+        with self._locked(namespace, exclusive=True):
+            ns = self._namespace(namespace)
+            if ns.is_stale():
+                ns.reload()
+            ns.upsert(vectors)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector: np.ndarray, top_k: int, namespace: str) -> List[dict]:
+        with self._locked(namespace, exclusive=False):
+            ns = self._namespace(namespace)
+            if ns.is_stale():
+                ns.reload()
+            return ns.query(vector, top_k)
+
+    def delete_namespace(self, namespace: str):
+        with self._locked(namespace, exclusive=True):
+            with self._lock:
+                self._namespaces.invalidate(lambda key: key == namespace)
+            shutil.rmtree(self._path(namespace), ignore_errors=True)
+
+
+class Retriever:
+    """
+    Top-k retrieval bound to one namespace.
+    """
+
+    def __init__(self, store: VectorStore, namespace: str, top_k: int):
+        self.store = store
+        self.namespace = namespace
+        self.top_k = top_k
+
+    def retrieve(self, query_vector: np.ndarray) -> List[dict]:
+        return self.store.query(query_vector, self.top_k, self.namespace)
+
+
+def merge_top_k(result_lists: Iterable[List[dict]], top_k: int) -> List[dict]:
+    """
+    Global top-k, by score, of matches retrieved from several namespaces.
+    """
+    return heapq.nlargest(
+        top_k,
+        itertools.chain.from_iterable(result_lists),
+        key=lambda match: match["score"] if match["score"] is not None else float("-inf"),
+    )
+
+
+def create_vector_store() -> VectorStore:
+    """
+    Build the configured backend. Called once per process through the registry.
+    """
+    if VECTOR_STORE == "local":
+        return LocalVectorStore()
+    if VECTOR_STORE == "pinecone":
+        from clients.registry import get_pinecone_index
+        return PineconeVectorStore(get_pinecone_index())
+    raise ValueError(f"Unknown VECTOR_STORE backend: {VECTOR_STORE}")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _field(obj, name: str):
+    # Pinecone responses are objects; fakes and older clients return dicts
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
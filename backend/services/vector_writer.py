@@ -0,0 +1,161 @@
+"""
+Bulk Vector Writer
+
+Streams vectors into an index in size-bounded upsert requests, with a
+bounded number of requests in flight and retries with exponential backoff.
+Vector ids are derived from (file_id, page, chunk_index), so re-running an
+ingestion overwrites the previous vectors instead of duplicating them.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from services.metrics import metrics_registry, span
+from services.telemetry import log_fields
+
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+# Pinecone rejects requests above 2 MB; stay comfortably below it
+UPSERT_MAX_BYTES = int(os.getenv("UPSERT_MAX_BYTES", str(1536 * 1024)))
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
+UPSERT_BACKOFF_SECONDS = float(os.getenv("UPSERT_BACKOFF_SECONDS", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+vectors_upserted = metrics_registry.counter("vectors_upserted_total", "Vectors written to the vector store.")
+upsert_retries = metrics_registry.counter("upsert_retries_total", "Upsert requests retried after a failure.")
+
+
+def vector_id(file_id: str, page: int, chunk_index: int) -> str:
+    """
+    Deterministic vector id for a chunk of a document.
+    """
+    return f"{file_id}#p{page}#c{chunk_index}"
+
+
+def estimate_vector_bytes(vector: dict) -> int:
+    """
+    Rough size of a vector in an upsert request body.
+    """
+    # Floats serialise to roughly 10 bytes each in JSON
+    return len(vector["id"]) + len(vector["values"]) * 10 + len(json.dumps(vector.get("metadata", {}))) + 32
+
+
+class BulkUpserter:
+    def __init__(
+        self,
+        index,
+        namespace: str,
+        batch_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+    ):
+        self.index = index
+        self.namespace = namespace
+        self.batch_size = batch_size or UPSERT_BATCH_SIZE
+        self.max_bytes = max_bytes or UPSERT_MAX_BYTES
+        self.concurrency = concurrency or UPSERT_CONCURRENCY
+        self.max_retries = UPSERT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = UPSERT_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upsert")
+        # Blocks add() while `concurrency` requests are in flight, so memory stays bounded
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._pending: List[dict] = []
+        self._pending_bytes = 0
+        self._futures = []
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+        self.vectors_upserted = 0
+        self.requests = 0
+        self.retries = 0
+
+    def add(self, vector: dict):
+        self._raise_if_failed()
+        size = estimate_vector_bytes(vector)
+        if self._pending and self._pending_bytes + size > self.max_bytes:
+            self._send()
+        self._pending.append(vector)
+        self._pending_bytes += size
+        if len(self._pending) >= self.batch_size:
+            self._send()
+
+    def add_many(self, vectors: Iterable[dict]):
+        for vector in vectors:
+            self.add(vector)
+
+    def flush(self):
+        """
+        Send any buffered vectors and wait for every in-flight request.
+        """
+        if self._pending:
+            self._send()
+        for future in self._futures:
+            future.result()
+        self._futures = []
+        self._raise_if_failed()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+    def _send(self):
+        batch = self._pending
+        self._pending = []
+        self._pending_bytes = 0
+        self._slots.acquire()
+        self._futures = [f for f in self._futures if not f.done()]
+        # Carry the request id into the upsert threads' logs
+        context = contextvars.copy_context()
+        self._futures.append(self._executor.submit(context.run, self._upsert_with_retry, batch))
+
+    def _upsert_with_retry(self, batch: List[dict]):
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with span("upsert", vectors=len(batch)):
+                        self.index.upsert(vectors=batch, namespace=self.namespace)
+                    vectors_upserted.inc(len(batch))
+                    with self._lock:
+                        self.vectors_upserted += len(batch)
+                        self.requests += 1
+                    return
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        with self._lock:
+                            if self._error is None:
+                                self._error = e
+                        return
+                    delay = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                    logger.warning("Upsert failed, retrying", extra=log_fields(
+                        namespace=self.namespace, vectors=len(batch), error=str(e), retry_in=round(delay, 2)
+                    ))
+                    upsert_retries.inc()
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(delay)
+        finally:
+            self._slots.release()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
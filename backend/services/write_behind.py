@@ -0,0 +1,89 @@
+"""
+Write-Behind Buffer for chats.updated_at
+
+With CHAT_TOUCH_WRITE_BEHIND=true, appending a message leaves
+chats.updated_at alone and records the bump here instead. A background task
+flushes the latest timestamp per chat every CHAT_TOUCH_FLUSH_INTERVAL
+seconds with one `touch_chats` call, so a burst of messages in one chat costs
+one update. Chat lists may show a chat's new position up to one interval late.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from services.repositories import chat_repository
+from services.telemetry import log_fields
+
+CHAT_TOUCH_WRITE_BEHIND = os.getenv("CHAT_TOUCH_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+CHAT_TOUCH_FLUSH_INTERVAL = float(os.getenv("CHAT_TOUCH_FLUSH_INTERVAL", "1.0"))
+
+logger = logging.getLogger(__name__)
+
+
+class ChatTouchBuffer:
+    """
+    Lives on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, enabled: bool = CHAT_TOUCH_WRITE_BEHIND, interval: float = CHAT_TOUCH_FLUSH_INTERVAL):
+        self.enabled = enabled
+        self.interval = interval
+        self._pending: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.touches = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def touch(self, chat_id: str, updated_at: str):
+        self.touches += 1
+        current = self._pending.get(chat_id)
+        if current is None or updated_at > current:
+            self._pending[chat_id] = updated_at
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await chat_repository.touch_many(pending)
+            self.flushes += 1
+            self.rows_written += len(pending)
+        except Exception:
+            logger.exception("Failed to flush chat timestamps", extra=log_fields(chats=len(pending)))
+            # Keep them for the next flush, without overwriting newer bumps
+            for chat_id, updated_at in pending.items():
+                self.touch(chat_id, updated_at)
+                self.touches -= 1
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+
+chat_touch_buffer = ChatTouchBuffer()
@@ -0,0 +1,9 @@
+"""
+The backend is imported as top-level packages (services, clients, routes),
+so the tests run with backend/ on sys.path, like uvicorn does.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+from services.chunker import SPECIAL_TOKENS, Chunker, RegexTokenizer
+
+TEXT = " ".join(
+    f"Clause {i} requires the supplier to deliver item {i} within {i % 9 + 1} days of the order."
+    for i in range(60)
+)
+
+
+def _tokens(text: str) -> int:
+    return len(RegexTokenizer().offsets(text))
+
+
+def test_chunks_never_exceed_max_tokens():
+    chunker = Chunker(max_tokens=40, overlap=8)
+    chunks = list(chunker.iter_chunks([{"page": 1, "text": TEXT}]))
+
+    assert len(chunks) > 10
+    for text, meta in chunks:
+        assert meta["token_count"] <= 40
+        assert _tokens(text) == meta["token_count"]
+        assert text == TEXT[meta["char_start"]:meta["char_end"]]
+
+
+def test_chunks_cover_the_page_with_overlap():
+    chunker = Chunker(max_tokens=40, overlap=8)
+    chunks, _ = chunker.chunk_page(1, TEXT)
+
+    assert chunks[0].char_start == 0 and chunks[-1].char_end == len(TEXT)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.char_start < previous.char_end  # Overlaps the previous chunk
+        assert chunk.char_start > previous.char_start
+
+
+def test_max_tokens_is_capped_by_the_model_sequence_length():
+    chunker = Chunker(max_tokens=384, max_seq_length=128)
+
+    assert chunker.max_tokens == 128 - SPECIAL_TOKENS
+    assert all(chunk.token_count <= 126 for chunk in chunker.chunk_page(1, TEXT * 3)[0])
+
+
+def test_cross_page_carry_stays_within_max_tokens():
+    chunker = Chunker(max_tokens=40, overlap=8, cross_page=True)
+    pages = [{"page": 1, "text": TEXT}, {"page": 2, "text": TEXT}]
+    chunks = list(chunker.iter_chunks(pages))
+
+    carried = [meta for _, meta in chunks if "carry_page" in meta]
+    assert [meta["page"] for meta in carried] == [2]
+    assert all(meta["token_count"] <= 40 for _, meta in chunks)
+    assert all(_tokens(text) == meta["token_count"] for text, meta in chunks)
@@ -0,0 +1,43 @@
+import pytest
+
+from clients.fakes import FakeEncoder, FakeIndex
+from clients.registry import registry
+from services.embedder import embed_and_store
+from services.embedding_server import EmbeddingServer
+from services.vector_store import PineconeVectorStore
+
+
+@pytest.fixture(autouse=True)
+def fake_ingestion(monkeypatch):
+    encoder = FakeEncoder(dim=32)
+    monkeypatch.setitem(registry._instances, "embedding_model", encoder)
+    monkeypatch.setitem(registry._instances, "embedding_server", EmbeddingServer(encoder.encode, batching=False))
+    monkeypatch.setitem(registry._instances, "vector_store", PineconeVectorStore(FakeIndex()))
+
+
+def _pages(blank=(2, 5), count: int = 6):
+    # Blank pages are extracted but produce no chunks
+    return [
+        {"page": page, "text": "" if page in blank else " ".join(f"Line {i} of page {page}." for i in range(30))}
+        for page in range(1, count + 1)
+    ]
+
+
+def test_checkpoints_count_pages_like_the_final_total():
+    commits = []
+    full = embed_and_store(_pages(), "doc", batch_size=8, segment_pages=2, on_commit=commits.append)
+
+    assert full["pages_processed"] == 6
+    assert [(c["pages_done"], c["pages_processed"]) for c in commits] == [(2, 2), (4, 4)]
+
+
+def test_resumed_run_ends_with_the_same_page_count():
+    commits = []
+    embed_and_store(_pages(), "doc", batch_size=8, segment_pages=2, on_commit=commits.append)
+    checkpoint = commits[0]
+
+    # Resume after page 2, starting one page early as process_pdf does
+    resumed = embed_and_store(_pages()[1:], "doc", batch_size=8, segment_pages=2, resume=checkpoint)
+
+    assert resumed["resumed_after_page"] == 2
+    assert resumed["pages_processed"] == 6
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+import pytest
+
+from services.embedding_server import QUERY, EmbeddingServer
+
+
+class BlockingEncoder:
+    """
+    Encodes one dimension per text length; the first call waits for `release`.
+    """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.release.wait(5)
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+def test_cancelled_requests_are_dropped_and_running_ones_cannot_be_cancelled():
+    encoder = BlockingEncoder()
+    server = EmbeddingServer(encoder, max_batch=4, max_wait_ms=0)
+    try:
+        running = server.submit(["first"], QUERY)
+        assert encoder.started.wait(5)
+        queued = server.submit(["dropped"], QUERY)
+
+        # A client that went away cancels its future; one being encoded is already claimed
+        assert queued.cancel()
+        assert not running.cancel()
+        encoder.release.set()
+
+        assert running.result(5).tolist() == [[5.0]]
+        assert server.encode(["after"], QUERY).tolist() == [[5.0]]
+        assert ["dropped"] not in encoder.batches
+        assert server.stats()["queued"][QUERY] == 0
+    finally:
+        encoder.release.set()
+        server.close()
+
+
+def test_unexpected_batch_error_fails_the_batch_but_keeps_the_thread():
+    server = EmbeddingServer(lambda texts: np.ones((len(texts), 2), dtype=np.float32), max_wait_ms=0)
+    process = server._process
+    calls = []
+
+    def fail_once(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("bookkeeping bug")
+        process(batch)
+
+    server._process = fail_once
+    try:
+        with pytest.raises(RuntimeError, match="bookkeeping bug"):
+            server.encode(["a"], QUERY)
+        assert server.encode(["b", "c"], QUERY).shape == (2, 2)
+    finally:
+        server.close()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from services.sse import HEARTBEAT_FRAME, answer_events
+
+
+async def _deltas(items, delay: float = 0.0, first_delay: float = 0.0, error: Exception = None):
+    await asyncio.sleep(first_delay)
+    for item in items:
+        yield item
+        await asyncio.sleep(delay)
+    if error is not None:
+        raise error
+
+
+def _frames(chunks, **kwargs) -> list:
+    async def collect():
+        return [frame async for frame in answer_events(chunks, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+def _payloads(frames) -> list:
+    return [json.loads(frame[len("data: "):]) for frame in frames if frame.startswith("data: ")]
+
+
+def test_stream_ends_with_a_done_event():
+    frames = _frames(_deltas(["word "] * 50), flush_interval_ms=20, heartbeat=5)
+    payloads = _payloads(frames)
+
+    assert payloads[-1] == {"done": True}
+    assert "".join(p.get("chunk", "") for p in payloads) == "word " * 50
+    assert all(frame.endswith("\n\n") for frame in frames)
+
+
+def test_first_delta_is_sent_alone_and_the_rest_coalesced():
+    payloads = _payloads(_frames(_deltas(["a"] * 100, delay=0.001), flush_interval_ms=200, heartbeat=5))
+    chunks = [p["chunk"] for p in payloads if "chunk" in p]
+
+    assert chunks[0] == "a"
+    assert len(chunks) < 10 and "".join(chunks) == "a" * 100
+
+
+def test_buffer_is_flushed_early_once_flush_bytes_is_reached():
+    payloads = _payloads(_frames(_deltas(["x" * 100] * 20), flush_interval_ms=10_000, flush_bytes=500, heartbeat=5))
+    chunks = [p["chunk"] for p in payloads if "chunk" in p]
+
+    assert "".join(chunks) == "x" * 2000
+    assert all(len(chunk) <= 600 for chunk in chunks[1:-1])
+
+
+def test_failure_sends_buffered_text_then_an_error_event():
+    frames = _frames(_deltas(["partial ", "answer"], error=RuntimeError("LLM went away")), flush_interval_ms=20, heartbeat=5)
+    payloads = _payloads(frames)
+
+    assert "".join(p.get("chunk", "") for p in payloads) == "partial answer"
+    assert payloads[-2:] == [{"error": "LLM went away"}, {"done": True}]
+
+
+def test_heartbeats_are_sent_while_waiting_for_the_first_delta():
+    frames = _frames(_deltas(["late"], first_delay=0.2), flush_interval_ms=20, heartbeat=0.05)
+    first_data = next(i for i, frame in enumerate(frames) if frame.startswith("data: "))
+
+    assert frames[:first_data] and all(frame == HEARTBEAT_FRAME for frame in frames[:first_data])
+    assert _payloads(frames) == [{"chunk": "late"}, {"done": True}]
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from clients.supabase_client import AsyncSupabase, DatabaseError
+
+URL = "https://project.supabase.co"
+
+
+def _client(handler, requests: list) -> AsyncSupabase:
+    def record(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return handler(request)
+
+    return AsyncSupabase(URL, "service-key", transport=httpx.MockTransport(record))
+
+
+def _run(client: AsyncSupabase, call):
+    async def main():
+        try:
+            return await call(client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+def test_filter_values_with_reserved_characters_are_sent_verbatim():
+    requests = []
+    client = _client(lambda request: httpx.Response(200, json=[{"id": "d1"}]), requests)
+
+    rows, total = _run(client, lambda db: db.select(
+        "documents", "id, filename",
+        filters=[("filename", "eq", "a,b.(c) & d#1.pdf"), ("pages_count", "not.is", "null")],
+        limit=1,
+    ))
+
+    assert rows == [{"id": "d1"}] and total is None
+    request = requests[0]
+    assert request.method == "GET" and request.url.path == "/rest/v1/documents"
+    assert request.headers["apikey"] == "service-key"
+    assert request.headers["authorization"] == "Bearer service-key"
+    params = request.url.params
+    assert params["select"] == "id,filename"
+    assert params.get_list("filename") == ["eq.a,b.(c) & d#1.pdf"]
+    assert params["pages_count"] == "not.is.null"
+    assert params["limit"] == "1"
+
+
+def test_in_filter_quotes_each_element():
+    requests = []
+    client = _client(lambda request: httpx.Response(200, json=[]), requests)
+
+    _run(client, lambda db: db.delete("documents", [("file_id", "in", ['a,b', 'say "hi"', "c)"])]))
+
+    request = requests[0]
+    assert request.method == "DELETE"
+    assert request.headers["prefer"] == "return=representation"
+    assert request.url.params["file_id"] == 'in.("a,b","say \\"hi\\"","c)")'
+
+
+def test_keyset_pagination_quotes_the_cursor_values():
+    requests = []
+    client = _client(lambda request: httpx.Response(200, json=[]), requests)
+
+    _run(client, lambda db: db.select(
+        "chats",
+        order=[("updated_at", True), ("id", True)],
+        limit=20,
+        after=["2024-05-01T10:00:00.123+00:00", "c,1"],
+    ))
+
+    params = requests[0].url.params
+    assert params["or"] == (
+        '(updated_at.lt."2024-05-01T10:00:00.123+00:00",'
+        'and(updated_at.eq."2024-05-01T10:00:00.123+00:00",id.lt."c,1"))'
+    )
+    assert params["order"] == "updated_at.desc,id.desc"
+
+
+def test_count_is_read_from_content_range():
+    requests = []
+    client = _client(lambda request: httpx.Response(200, json=[], headers={"Content-Range": "*/42"}), requests)
+
+    rows, total = _run(client, lambda db: db.select("documents", "id", filters=[("file_id", "eq", "f1")], limit=0, count=True))
+
+    assert rows == [] and total == 42
+    assert requests[0].headers["prefer"] == "count=exact"
+
+
+def test_update_sends_values_and_filters():
+    requests = []
+    client = _client(lambda request: httpx.Response(200, json=[{"id": "d1", "pages_count": 3}]), requests)
+
+    rows = _run(client, lambda db: db.update("documents", {"pages_count": 3}, [("file_id", "eq", "f1")]))
+
+    request = requests[0]
+    assert rows == [{"id": "d1", "pages_count": 3}]
+    assert request.method == "PATCH"
+    assert request.url.params["file_id"] == "eq.f1"
+    assert json.loads(request.content) == {"pages_count": 3}
+
+
+def test_errors_raise_database_error_with_code():
+    requests = []
+    client = _client(
+        lambda request: httpx.Response(409, json={"message": "duplicate key value", "code": "23505"}),
+        requests,
+    )
+
+    with pytest.raises(DatabaseError) as error:
+        _run(client, lambda db: db.insert("documents", [{"file_id": "f1"}]))
+
+    assert error.value.status_code == 409
+    assert error.value.code == "23505"
+    assert str(error.value) == "duplicate key value"
+
+
+def test_storage_paths_are_percent_encoded():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "/object/sign/" in request.url.path:
+            return httpx.Response(200, json={"signedURL": "/object/sign/pdfs/a%20b%231.pdf?token=t"})
+        return httpx.Response(200, json={"Key": "pdfs/a b#1.pdf"})
+
+    client = _client(handler, requests)
+
+    async def calls(db: AsyncSupabase):
+        await db.upload("pdfs", "a b#1.pdf", b"%PDF", "application/pdf")
+        signed = await db.create_signed_url("pdfs", "a b#1.pdf", 60)
+        await db.remove("pdfs", ["a b#1.pdf"])
+        return signed
+
+    signed = _run(client, calls)
+
+    upload, sign, remove = requests
+    assert upload.url.raw_path == b"/storage/v1/object/pdfs/a%20b%231.pdf"
+    assert upload.headers["content-type"] == "application/pdf" and upload.content == b"%PDF"
+    assert sign.url.raw_path == b"/storage/v1/object/sign/pdfs/a%20b%231.pdf"
+    assert json.loads(sign.content) == {"expiresIn": 60}
+    assert signed == f"{URL}/storage/v1/object/sign/pdfs/a%20b%231.pdf?token=t"
+    assert remove.method == "DELETE" and json.loads(remove.content) == {"prefixes": ["a b#1.pdf"]}
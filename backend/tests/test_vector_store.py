@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+
+from services.vector_store import LocalVectorStore
+
+
+def _vector(idx: int) -> np.ndarray:
+    vector = np.zeros(16, dtype=np.float32)
+    vector[idx % 16] = 1.0
+    vector[(idx // 16) % 16] += 0.5
+    return vector / np.linalg.norm(vector)
+
+
+def test_concurrent_upserts_survive_namespace_eviction(tmp_path):
+    # cache_size=1 and queries on other namespaces evict "shared" while it is being written
+    store = LocalVectorStore(str(tmp_path), cache_size=1)
+    stop = threading.Event()
+
+    def write(thread: int):
+        for batch in range(10):
+            ids = range(thread * 100 + batch * 10, thread * 100 + batch * 10 + 10)
+            store.upsert([{"id": f"v{i}", "values": _vector(i).tolist(), "metadata": {"idx": i}} for i in ids], "shared")
+
+    def read():
+        i = 0
+        while not stop.is_set():
+            store.query(np.ones(16), 3, f"other-{i % 3}")
+            i += 1
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(t,)) for t in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    namespace = LocalVectorStore(str(tmp_path))._namespace("shared")
+    assert len(namespace.metadata) == 400
+    for row, metadata in enumerate(namespace.metadata):
+        assert np.allclose(namespace.matrix[row], _vector(metadata["idx"]), atol=1e-5)
+
+
+def test_reload_forgets_dimension_of_deleted_namespace(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert([{"id": "a", "values": [1.0, 0.0, 0.0], "metadata": {}}], "doc")
+    namespace = store._namespace("doc")
+    store.delete_namespace("doc")
+
+    namespace.reload()
+    assert namespace.dim is None
+    store.upsert([{"id": "b", "values": [1.0, 0.0], "metadata": {"text": "b"}}], "doc")
+    assert store.query(np.array([1.0, 0.0]), 1, "doc")[0]["id"] == "b"
@@ -0,0 +1,115 @@
+import pytest
+
+from clients.fakes import FakeEncoder, FakeIndex
+from clients.registry import registry
+from services import vector_writer
+from services.embedder import embed_and_store
+from services.embedding_server import EmbeddingServer
+from services.vector_store import PineconeVectorStore
+from services.vector_writer import BulkUpserter, estimate_vector_bytes, vector_id
+
+
+class RecordingIndex(FakeIndex):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def upsert(self, vectors, namespace: str = ""):
+        response = super().upsert(vectors, namespace)
+        self.batches.append(list(vectors))
+        return response
+
+
+def _vector(i: int, text: str = "") -> dict:
+    return {"id": f"v{i}", "values": [0.1] * 8, "metadata": {"text": text}}
+
+
+def test_requests_are_bounded_by_batch_size():
+    index = RecordingIndex()
+    with BulkUpserter(index, "ns", batch_size=100, concurrency=1) as writer:
+        writer.add_many(_vector(i) for i in range(250))
+
+    assert [len(batch) for batch in index.batches] == [100, 100, 50]
+    assert writer.vectors_upserted == 250 and writer.requests == 3
+    assert index.count("ns") == 250
+
+
+def test_requests_are_bounded_by_bytes():
+    index = RecordingIndex()
+    vectors = [_vector(i, text="x" * 1000) for i in range(40)]
+    max_bytes = 3 * estimate_vector_bytes(vectors[0]) + 10
+
+    with BulkUpserter(index, "ns", batch_size=100, max_bytes=max_bytes, concurrency=2) as writer:
+        writer.add_many(vectors)
+
+    assert sum(len(batch) for batch in index.batches) == 40
+    assert all(sum(estimate_vector_bytes(v) for v in batch) <= max_bytes for batch in index.batches)
+    assert max(len(batch) for batch in index.batches) == 3
+
+
+def test_failed_upserts_are_retried_with_exponential_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(vector_writer.time, "sleep", delays.append)
+    index = FakeIndex(fail_times=2)
+
+    with BulkUpserter(index, "ns", batch_size=10, concurrency=1, max_retries=3, backoff_seconds=0.1) as writer:
+        writer.add_many(_vector(i) for i in range(10))
+
+    assert index.count("ns") == 10 and index.upsert_calls == 3
+    assert writer.retries == 2
+    # Jittered between 0.5x and 1.5x of 0.1 * 2 ** attempt
+    assert 0.05 <= delays[0] <= 0.15 and 0.1 <= delays[1] <= 0.3
+
+
+def test_upsert_error_is_raised_once_retries_are_exhausted(monkeypatch):
+    monkeypatch.setattr(vector_writer.time, "sleep", lambda seconds: None)
+    index = FakeIndex(fail_times=10)
+    writer = BulkUpserter(index, "ns", batch_size=10, concurrency=1, max_retries=2)
+
+    writer.add_many(_vector(i) for i in range(10))
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    writer.close()
+
+    assert index.upsert_calls == 3 and index.count("ns") == 0
+
+
+@pytest.fixture
+def fake_ingestion(monkeypatch):
+    encoder = FakeEncoder(dim=32)
+    index = RecordingIndex()
+    monkeypatch.setitem(registry._instances, "embedding_model", encoder)
+    monkeypatch.setitem(registry._instances, "embedding_server", EmbeddingServer(encoder.encode, batching=False))
+    monkeypatch.setitem(registry._instances, "vector_store", PineconeVectorStore(index))
+    return index
+
+
+def _pages(count: int):
+    return [
+        {"page": page, "text": " ".join(f"Sentence {i} on page {page} about topic {i % 7}." for i in range(40))}
+        for page in range(1, count + 1)
+    ]
+
+
+def test_resumed_ingestion_overwrites_the_same_vector_ids(fake_ingestion):
+    index = fake_ingestion
+    commits = []
+    first = embed_and_store(_pages(6), "doc", batch_size=16, segment_pages=2, on_commit=commits.append)
+    ids = set(index.namespaces["doc"])
+
+    assert commits[-1]["pages_done"] == 4
+    assert first["vectors_stored"] == len(ids)
+    assert all(id_.startswith("doc#p") for id_ in ids)
+
+    # Resume from the last checkpoint, starting one page early as process_pdf does
+    checkpoint = commits[-1]
+    written_before = sum(len(batch) for batch in index.batches)
+    resumed = embed_and_store(_pages(6)[3:], "doc", batch_size=16, segment_pages=2, resume=checkpoint)
+    rewritten = [vector["id"] for batch in index.batches for vector in batch][written_before:]
+
+    assert set(index.namespaces["doc"]) == ids
+    assert rewritten and set(rewritten) < ids
+    assert {vector_id("doc", 5, 0), vector_id("doc", 6, 0)} <= set(rewritten)
+    assert not any(id_.startswith(("doc#p1#", "doc#p2#", "doc#p3#", "doc#p4#")) for id_ in rewritten)
+    assert resumed["resumed_after_page"] == 4
+    assert resumed["vectors_stored"] == first["vectors_stored"]
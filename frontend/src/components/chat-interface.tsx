@@ -20,7 +20,7 @@ import {
 import { cn } from "@/lib/utils"
 import { apiService } from "@/services/api"
 import { userService } from "@/services/user"
-import type { Chat } from "@/services/api"
+import type { Chat, ChatSummary } from "@/services/api"
 
 interface LocalMessage {
   id: string
@@ -38,15 +38,20 @@ export function ChatInterface() {
   // Responsive sidebar: default closed on mobile (< 768px), open on desktop
   const [sidebarOpen, setSidebarOpen] = useState(false)
   const [isMobile, setIsMobile] = useState(false)
-  const [chats, setChats] = useState<Chat[]>([])
+  const [chats, setChats] = useState<ChatSummary[]>([])
+  const [chatsCursor, setChatsCursor] = useState<string | null>(null)
   const [currentChat, setCurrentChat] = useState<Chat | null>(null)
   const [messages, setMessages] = useState<LocalMessage[]>([])
+  const [messagesCursor, setMessagesCursor] = useState<string | null>(null)
   const [inputMessage, setInputMessage] = useState("")
   const [isLoading, setIsLoading] = useState(false)
   const [isUploading, setIsUploading] = useState(false)
+  const [uploadProgress, setUploadProgress] = useState<string | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [currentUserId, setCurrentUserId] = useState<string>("")
   const messagesEndRef = useRef<HTMLDivElement>(null)
+  // Prepending older messages should not jump to the bottom
+  const skipScrollRef = useRef(false)
 
   // Check if screen is mobile and set initial sidebar state
   useEffect(() => {
@@ -83,6 +88,10 @@ export function ChatInterface() {
   }, [isMobile, sidebarOpen])
   // Scroll to bottom when messages change
   useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false
+      return
+    }
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" })
   }, [messages])
 
@@ -103,13 +112,27 @@ export function ChatInterface() {
     } else {
       setCurrentChat(null)
       setMessages([])
+      setMessagesCursor(null)
     }
   }, [chatId])
 
   const loadChats = async () => {
     try {
-      const loadedChats = await apiService.getAllChats()
-      setChats(loadedChats)
+      const page = await apiService.getAllChats()
+      setChats(page.chats)
+      setChatsCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load chats:', error)
+      setError('Failed to load chats')
+    }
+  }
+
+  const loadMoreChats = async () => {
+    if (!chatsCursor) return
+    try {
+      const page = await apiService.getAllChats(chatsCursor)
+      setChats(prev => [...prev, ...page.chats])
+      setChatsCursor(page.next_cursor)
     } catch (error) {
       console.error('Failed to load chats:', error)
       setError('Failed to load chats')
@@ -124,16 +147,34 @@ export function ChatInterface() {
         ...msg,
         timestamp: new Date(msg.created_at)
       })))
+      setMessagesCursor(chatWithMessages.next_cursor)
       setError(null)
     } catch (error) {      console.error('Failed to load chat:', error)
       setError('Failed to load chat')
     }
   }
 
+  const loadEarlierMessages = async () => {
+    if (!currentChat || !messagesCursor) return
+    try {
+      const page = await apiService.getChatMessages(currentChat.id, messagesCursor)
+      skipScrollRef.current = true
+      setMessages(prev => [
+        ...page.messages.map(msg => ({ ...msg, timestamp: new Date(msg.created_at) })),
+        ...prev
+      ])
+      setMessagesCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load messages:', error)
+      setError('Failed to load messages')
+    }
+  }
+
   const createNewChat = () => {
     navigate('/chat')
     setCurrentChat(null)
     setMessages([])
+    setMessagesCursor(null)
     // Auto-close sidebar on mobile after creating new chat
     if (isMobile) {
       setSidebarOpen(false)
@@ -146,6 +187,7 @@ export function ChatInterface() {
     setChats([])
     setCurrentChat(null)
     setMessages([])
+    setMessagesCursor(null)
     navigate('/chat')
     await loadChats()
   }
@@ -159,7 +201,15 @@ export function ChatInterface() {
 
     try {
       // Upload PDF to backend
-      const uploadResult = await apiService.uploadPdf(file)      // Create new chat in database
+      const uploadResult = await apiService.uploadPdf(file)
+      // Wait for background ingestion before the chat can answer questions
+      if (uploadResult.status !== 'done' && uploadResult.job_id) {
+        await apiService.waitForJob(uploadResult.job_id, (job) => {
+          const { current_page, pages_committed, page_count } = job.progress || {}
+          const page = current_page ?? pages_committed ?? 0
+          setUploadProgress(page_count ? `Processing page ${page}/${page_count}...` : null)
+        })
+      }      // Create new chat in database
       const newChat = await apiService.createChat(
         file.name.replace('.pdf', ''),
         uploadResult.document_id,  // Use document_id for database reference
@@ -168,6 +218,7 @@ export function ChatInterface() {
       setChats(prev => [newChat, ...prev])
       setCurrentChat(newChat)
       setMessages([])
+      setMessagesCursor(null)
       
       // Navigate to the new chat
       navigate(`/chat/${newChat.id}`)
@@ -177,6 +228,7 @@ export function ChatInterface() {
       setError(error instanceof Error ? error.message : 'Failed to upload PDF')
     } finally {
       setIsUploading(false)
+      setUploadProgress(null)
       // Reset file input
       event.target.value = ''    }
   }
@@ -272,7 +324,7 @@ export function ChatInterface() {
       setIsLoading(false)
     }
   }
-  const selectChat = (chat: Chat) => {
+  const selectChat = (chat: ChatSummary) => {
     navigate(`/chat/${chat.id}`)
     // Auto-close sidebar on mobile after selecting a chat
     if (isMobile) {
@@ -280,7 +332,7 @@ export function ChatInterface() {
     }
   }
 
-  const deleteChat = async (chatToDelete: Chat) => {
+  const deleteChat = async (chatToDelete: ChatSummary) => {
     try {
       await apiService.deleteChat(chatToDelete.id)
       setChats(prev => prev.filter(chat => chat.id !== chatToDelete.id))
@@ -384,6 +436,11 @@ export function ChatInterface() {
                 </Button>
               </div>
             ))}
+            {chatsCursor && (
+              <Button variant="ghost" size="sm" className="w-full" onClick={loadMoreChats}>
+                Load more chats
+              </Button>
+            )}
           </div>
         </ScrollArea>
       </div>      {/* Main Content */}
@@ -456,7 +513,7 @@ export function ChatInterface() {
                         ) : (
                           <Upload className="h-4 w-4 mr-2" />
                         )}
-                        {isUploading ? "Uploading..." : "Choose PDF File"}
+                        {isUploading ? (uploadProgress || "Uploading...") : "Choose PDF File"}
                       </div>
                     </Button>
                   </label>
@@ -474,6 +531,13 @@ export function ChatInterface() {
             <div className="flex-1 flex flex-col overflow-hidden min-h-0">
               <div className="flex-1 overflow-y-auto p-2 md:p-4 min-h-0">
                 <div className="space-y-4 max-w-4xl mx-auto">
+                  {messagesCursor && (
+                    <div className="text-center">
+                      <Button variant="ghost" size="sm" onClick={loadEarlierMessages}>
+                        Load earlier messages
+                      </Button>
+                    </div>
+                  )}
                   {messages.length === 0 ? (
                     <div className="text-center py-8">
                       <MessageSquare className="h-12 w-12 mx-auto text-muted-foreground mb-4" />
@@ -12,17 +12,55 @@ export interface Chat {
   updated_at: string;
 }
 
+// The columns the chat list renders
+export type ChatSummary = Pick<Chat, 'id' | 'title' | 'created_at' | 'updated_at'>;
+
+export interface ChatPage {
+  chats: ChatSummary[];
+  next_cursor: string | null;
+}
+
 export interface Message {
   id: string;
-  chat_id: string;
+  chat_id?: string;  // Omitted in history pages
   content: string;
   sender: 'user' | 'assistant';
   created_at: string;
 }
 
-export interface ChatWithMessages {
-  chat: Chat;
+export interface IngestionJob {
+  job_id: string;
+  file_id: string;
+  status: 'queued' | 'extracting' | 'embedding' | 'upserting' | 'done' | 'failed';
+  result: any;
+  error: string | null;
+  progress: IngestionProgress;
+  created_at: number;
+  updated_at: number;
+}
+
+export interface IngestionProgress {
+  page_count?: number;
+  pages_committed?: number;   // Pages safely stored; a retry resumes after them
+  current_page?: number;
+  vectors_stored?: number;
+  resumed_from_page?: number;
+}
+
+export interface MessagePage {
   messages: Message[];
+  next_cursor: string | null;  // Fetches older messages
+}
+
+export interface ChatWithMessages extends MessagePage {
+  chat: Chat;
+}
+
+export interface BatchAnswer {
+  index: number;
+  question: string;
+  answer?: string;
+  error?: string;
 }
 
 class ApiService {
@@ -82,9 +120,23 @@ class ApiService {
 
     return response.json();
   }
-  async getAllChats(): Promise<Chat[]> {
+
+  async getChatMessages(chatId: string, cursor: string): Promise<MessagePage> {
+    const params = new URLSearchParams({ cursor });
+    const response = await fetch(`${API_BASE_URL}/chat/${chatId}/messages?${params}`);
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to fetch messages');
+    }
+
+    return response.json();
+  }
+
+  async getAllChats(cursor?: string | null): Promise<ChatPage> {
     const userId = userService.getUserId();
-    const response = await fetch(`${API_BASE_URL}/chat/user/${userId}/chats`);
+    const params = new URLSearchParams(cursor ? { cursor } : {});
+    const response = await fetch(`${API_BASE_URL}/chat/user/${userId}/chats?${params}`);
 
     if (!response.ok) {
       const error = await response.json();
@@ -109,7 +161,9 @@ class ApiService {
     document_id: string;
     filename: string;
     signed_url: string;
-    processing_result: any;
+    job_id: string | null;
+    status: IngestionJob['status'];
+    deduplicated: boolean;
   }> {
     const userId = userService.getUserId();
     const formData = new FormData();
@@ -129,9 +183,57 @@ class ApiService {
     }
 
     return response.json();
+  }
+
+  async getJob(jobId: string): Promise<IngestionJob> {
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to fetch job status');
+    }
+
+    return response.json();
+  }
+
+  // Follows the job's event stream; falls back to polling if the stream fails
+  waitForJob(jobId: string, onUpdate?: (job: IngestionJob) => void): Promise<IngestionJob> {
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+      events.onmessage = (event) => {
+        const job: IngestionJob = JSON.parse(event.data);
+        onUpdate?.(job);
+        if (job.status === 'done') {
+          events.close();
+          resolve(job);
+        } else if (job.status === 'failed') {
+          events.close();
+          reject(new Error(job.error || 'Failed to process PDF'));
+        }
+      };
+      events.onerror = () => {
+        events.close();
+        this.pollJob(jobId, onUpdate).then(resolve, reject);
+      };
+    });
+  }
+
+  async pollJob(jobId: string, onUpdate?: (job: IngestionJob) => void, intervalMs = 1000): Promise<IngestionJob> {
+    while (true) {
+      const job = await this.getJob(jobId);
+      onUpdate?.(job);
+      if (job.status === 'done') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Failed to process PDF');
+      }
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
   }  // Question API - Now returns streaming response
+  // Pass several file ids to answer across documents
   async askQuestionStream(
-    fileId: string, 
+    fileId: string | string[],
     question: string, 
     onChunk: (chunk: string) => void,
     onComplete: () => void,
@@ -144,7 +246,7 @@ class ApiService {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          file_id: fileId,
+          ...(Array.isArray(fileId) ? { file_ids: fileId } : { file_id: fileId }),
           question,
         }),
       });
@@ -201,6 +303,54 @@ class ApiService {
       onError(error instanceof Error ? error.message : 'Unknown error occurred');
     }
   }
+
+  // Answers arrive in completion order; use `index` to match them to `questions`
+  async askQuestionsBatch(
+    fileId: string,
+    questions: string[],
+    onResult: (result: BatchAnswer) => void
+  ): Promise<void> {
+    const response = await fetch(`${API_BASE_URL}/ask-question/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        file_id: fileId,
+        questions,
+      }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to answer questions');
+    }
+
+    const reader = response.body?.getReader();
+    if (!reader) {
+      throw new Error('No response body reader available');
+    }
+
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value, { stream: !done });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+
+      for (const line of lines) {
+        if (line.trim()) {
+          onResult(JSON.parse(line));
+        }
+      }
+
+      if (done) {
+        break;
+      }
+    }
+  }
 }
 
 export const apiService = new ApiService();